@@ -0,0 +1,113 @@
+import os
+import csv
+import heapq
+import logging
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+AIRPORT_DATASET_PATH = os.getenv(
+    "AIRPORT_DATASET_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "airports.csv"),
+)
+
+# Match kinds, best first
+EXACT_CODE, CODE_PREFIX, CITY_PREFIX, NAME_PREFIX, CITY_WORD_PREFIX, NAME_WORD_PREFIX = range(6)
+
+
+def normalize(text):
+    """
+    Uppercases and strips accents and punctuation so "Málaga" and "malaga" index the same.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in stripped.upper()).split())
+
+
+def word_suffixes(text):
+    """
+    Yields the text starting from its second word onwards: "LOS ANGELES INTL" -> "ANGELES INTL", "INTL".
+    """
+    words = text.split()
+    for i in range(1, len(words)):
+        yield " ".join(words[i:])
+
+
+class AirportIndex:
+    """
+    Prefix index over airports and cities, kept as one sorted array of terms searched with bisect.
+
+    Each location contributes its IATA code, its city and airport names, and those names starting from
+    every later word, so "bar", "el prat" and "BCN" all find Barcelona. Results are ranked by match kind,
+    cities before airports, then by dataset order (the bundled file is roughly sorted by traffic).
+    """
+
+    def __init__(self, locations):
+        self.locations = tuple(locations)
+        entries = []
+        for position, location in enumerate(self.locations):
+            entries.append((normalize(location["iataCode"]), CODE_PREFIX, position))
+            city = normalize(location["address"]["cityName"])
+            name = normalize(location["name"])
+            entries.append((city, CITY_PREFIX, position))
+            entries.append((name, NAME_PREFIX, position))
+            entries.extend((suffix, CITY_WORD_PREFIX, position) for suffix in word_suffixes(city))
+            entries.extend((suffix, NAME_WORD_PREFIX, position) for suffix in word_suffixes(name))
+        entries.sort()
+        self._terms = [term for term, _, _ in entries]
+        self._matches = [(kind, position) for _, kind, position in entries]
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(
+                {
+                    "type": "location",
+                    "subType": row["sub_type"],
+                    "name": row["name"],
+                    "iataCode": row["iata_code"],
+                    "address": {"cityName": row["city_name"], "countryCode": row["country_code"]},
+                }
+                for row in csv.DictReader(f)
+            )
+
+    def search(self, term, sub_types=("AIRPORT", "CITY"), limit=10):
+        """
+        Returns up to `limit` locations whose code, city or name (or a word in them) starts with `term`.
+        """
+        prefix = normalize(term)
+        if not prefix:
+            return []
+
+        best = {}
+        start = bisect_left(self._terms, prefix)
+        for i in range(start, len(self._terms)):
+            if not self._terms[i].startswith(prefix):
+                break
+            kind, position = self._matches[i]
+            if kind == CODE_PREFIX and self._terms[i] == prefix:
+                kind = EXACT_CODE
+            if self.locations[position]["subType"] in sub_types and kind < best.get(position, NAME_WORD_PREFIX + 1):
+                best[position] = kind
+
+        ranked = heapq.nsmallest(
+            limit,
+            best.items(),
+            key=lambda item: (item[1], self.locations[item[0]]["subType"] != "CITY", item[0]),
+        )
+        return [self.locations[position] for position, _ in ranked]
+
+    def __len__(self):
+        return len(self.locations)
+
+
+@lru_cache(maxsize=1)
+def get_airport_index():
+    """
+    Loads the bundled airport dataset once per process.
+    """
+    index = AirportIndex.from_csv(AIRPORT_DATASET_PATH)
+    logger.info(f"Loaded {len(index)} locations into the airport index")
+    return index
@@ -0,0 +1,43 @@
+"""Add next_due_at to flight_notifications
+
+Revision ID: 7c2e4b9d1a05
+Revises: e32b2c57ad3f
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e4b9d1a05'
+down_revision: Union[str, None] = 'e32b2c57ad3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('flight_notifications', sa.Column('next_due_at', sa.DateTime(), nullable=True))
+    # Existing rows are due one interval after their last notification, or right away if never sent
+    op.execute("""
+        UPDATE flight_notifications
+        SET next_due_at = CASE
+            WHEN last_notification IS NULL THEN now() AT TIME ZONE 'utc'
+            ELSE last_notification + (frequency || ' ' || frequency_unit)::interval
+        END
+    """)
+    op.alter_column('flight_notifications', 'next_due_at', nullable=False)
+    op.create_index(
+        'ix_flight_notifications_due',
+        'flight_notifications',
+        ['next_due_at', 'id'],
+        unique=False,
+        postgresql_where=sa.text('is_active'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_flight_notifications_due', table_name='flight_notifications')
+    op.drop_column('flight_notifications', 'next_due_at')
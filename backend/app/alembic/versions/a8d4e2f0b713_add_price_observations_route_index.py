@@ -0,0 +1,27 @@
+"""Add the (origin, destination, observed_at) price_observations index
+
+Revision ID: a8d4e2f0b713
+Revises: f2a7c3e91b54
+Create Date: 2026-10-18 16:02:45.308817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d4e2f0b713'
+down_revision: Union[str, None] = 'f2a7c3e91b54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Created on the partitioned parent, so PostgreSQL builds it on every partition, current and future
+    op.create_index('ix_price_observations_route_observed_at', 'price_observations', ['origin', 'destination', 'observed_at', 'departure_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_price_observations_route_observed_at', table_name='price_observations')
@@ -0,0 +1,49 @@
+"""Add month-partitioned price_observations
+
+Revision ID: d93a5f1c6e48
+Revises: b41d0e6f8c27
+Create Date: 2026-10-18 11:26:02.771348
+
+"""
+from datetime import date, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93a5f1c6e48'
+down_revision: Union[str, None] = 'b41d0e6f8c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('price_observations',
+    sa.Column('origin', sa.CHAR(length=3), nullable=False),
+    sa.Column('destination', sa.CHAR(length=3), nullable=False),
+    sa.Column('departure_date', sa.Date(), nullable=False),
+    sa.Column('observed_at', sa.DateTime(), nullable=False),
+    sa.Column('min_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('median_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('offer_count', sa.Integer(), nullable=False),
+    sa.Column('currency', sa.CHAR(length=3), nullable=True),
+    sa.Column('search_max_price', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('origin', 'destination', 'departure_date', 'observed_at'),
+    postgresql_partition_by='RANGE (observed_at)'
+    )
+    # Partitions for the current and next two months; the daily ensure_price_partitions task keeps ahead after that
+    month_start = date.today().replace(day=1)
+    for _ in range(3):
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS price_observations_y{month_start.year}m{month_start.month:02d} "
+            f"PARTITION OF price_observations FOR VALUES FROM ('{month_start}') TO ('{next_month}')"
+        )
+        month_start = next_month
+
+
+def downgrade() -> None:
+    # Dropping the parent drops its partitions
+    op.drop_table('price_observations')
@@ -0,0 +1,28 @@
+"""Add users.notifications_version and the (user_id, id) notification index
+
+Revision ID: f2a7c3e91b54
+Revises: d93a5f1c6e48
+Create Date: 2026-10-18 14:21:40.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c3e91b54'
+down_revision: Union[str, None] = 'd93a5f1c6e48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('notifications_version', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_flight_notifications_user_id_id', 'flight_notifications', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_flight_notifications_user_id_id', table_name='flight_notifications')
+    op.drop_column('users', 'notifications_version')
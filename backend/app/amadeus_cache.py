@@ -0,0 +1,238 @@
+import os
+import json
+import asyncio
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+import redis
+from .redis_client import get_redis, mark_redis_down
+from .single_flight import SingleFlight, AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint TTLs in seconds: offers go stale in minutes, reference data almost never changes
+CACHE_TTLS = {
+    "flight_offers": int(os.getenv("CACHE_TTL_FLIGHT_OFFERS", 300)),
+    "flight_destinations_body": int(os.getenv("CACHE_TTL_FLIGHT_DESTINATIONS", 900)),
+    "locations": int(os.getenv("CACHE_TTL_LOCATIONS", 7 * 24 * 3600)),
+}
+DEFAULT_TTL = 300
+
+# Size bounds for the in-process L1 and for each endpoint's keys in Redis
+L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", 1024))
+REDIS_MAX_ENTRIES = int(os.getenv("CACHE_REDIS_MAX_ENTRIES", 50000))
+
+# L1 entries live at most this long, bounding how stale one process can be compared to Redis
+L1_MAX_TTL = int(os.getenv("CACHE_L1_MAX_TTL", 60))
+
+KEY_PREFIX = "amadeus"
+MISSING = object()
+
+# Marks Redis values holding an undecoded response body (bytes), which are stored as they are instead of as JSON.
+# JSON text never starts with a NUL byte.
+RAW_MARKER = b"\x00"
+
+
+def encode_value(value):
+    if isinstance(value, bytes):
+        return RAW_MARKER + value
+    return json.dumps(value)
+
+
+def decode_value(raw):
+    if raw.startswith(RAW_MARKER):
+        return raw[len(RAW_MARKER):]
+    return json.loads(raw)
+
+
+def make_cache_key(endpoint, params):
+    """
+    Builds a cache key from the endpoint and its params, ignoring param order, None values and string case.
+    """
+    normalized = sorted(
+        (name, value.strip().upper() if isinstance(value, str) else value)
+        for name, value in params.items()
+        if value is not None
+    )
+    digest = hashlib.sha1(json.dumps(normalized, default=str, separators=(",", ":")).encode()).hexdigest()
+    return f"{KEY_PREFIX}:{endpoint}:{digest}"
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a per-entry TTL.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AmadeusCache:
+    """
+    Two-level cache for Amadeus responses: an in-process L1 in front of the Redis shared by the API and workers.
+    """
+
+    def __init__(self, redis_getter=get_redis, l1_max_entries=L1_MAX_ENTRIES, redis_max_entries=REDIS_MAX_ENTRIES):
+        self.redis_getter = redis_getter
+        self.redis_max_entries = redis_max_entries
+        self.l1 = TTLCache(l1_max_entries)
+        self.stats = defaultdict(lambda: {"l1_hits": 0, "l2_hits": 0, "misses": 0})
+        # Concurrent misses for the same key share one upstream call
+        self.flights = SingleFlight()
+        self.async_flights = AsyncSingleFlight()
+
+    def get(self, endpoint, params):
+        key = make_cache_key(endpoint, params)
+        value = self._l1_get(endpoint, key)
+        if value is MISSING:
+            value = self._l2_get(endpoint, key)
+        return value
+
+    def set(self, endpoint, params, value):
+        key = make_cache_key(endpoint, params)
+        ttl = CACHE_TTLS.get(endpoint, DEFAULT_TTL)
+        self.l1.set(key, value, min(ttl, L1_MAX_TTL))
+        self._redis_set(endpoint, key, value, ttl)
+
+    def get_or_fetch(self, endpoint, params, fetch):
+        """
+        Returns the cached value for the request, calling fetch() and caching its result on a miss.
+        Identical misses in flight at the same time wait for a single fetch() and share its result.
+        Exceptions raised by fetch() propagate to every waiter and nothing is cached.
+        """
+        key = make_cache_key(endpoint, params)
+        value = self._l1_get(endpoint, key)
+        if value is MISSING:
+            value = self._l2_get(endpoint, key)
+        if value is MISSING:
+            value = self.flights.do(key, lambda: self._fetch_and_set(endpoint, params, fetch), label=endpoint)
+        return value
+
+    def _fetch_and_set(self, endpoint, params, fetch):
+        value = fetch()
+        self.set(endpoint, params, value)
+        return value
+
+    async def get_or_fetch_async(self, endpoint, params, fetch):
+        """
+        Async variant of get_or_fetch for the API: L1 is checked inline, Redis round trips run in a
+        worker thread so they don't block the event loop, and fetch() is awaited.
+        """
+        key = make_cache_key(endpoint, params)
+        value = self._l1_get(endpoint, key)
+        if value is MISSING:
+            value = await asyncio.to_thread(self._l2_get, endpoint, key)
+        if value is MISSING:
+            value = await self.async_flights.do(key, lambda: self._fetch_and_set_async(endpoint, params, fetch), label=endpoint)
+        return value
+
+    async def _fetch_and_set_async(self, endpoint, params, fetch):
+        value = await fetch()
+        await asyncio.to_thread(self.set, endpoint, params, value)
+        return value
+
+    def cache_stats(self):
+        stats = {endpoint: dict(counters) for endpoint, counters in self.stats.items()}
+        for flights in (self.flights, self.async_flights):
+            for endpoint, counters in flights.flight_stats().items():
+                stats.setdefault(endpoint, {})
+                stats[endpoint]["coalesced"] = stats[endpoint].get("coalesced", 0) + counters["coalesced"]
+        return stats
+
+    def _l1_get(self, endpoint, key):
+        value = self.l1.get(key)
+        if value is not MISSING:
+            self.stats[endpoint]["l1_hits"] += 1
+        return value
+
+    def _l2_get(self, endpoint, key):
+        value = self._redis_get(key)
+        if value is MISSING:
+            self.stats[endpoint]["misses"] += 1
+        else:
+            self.stats[endpoint]["l2_hits"] += 1
+            self.l1.set(key, value, min(CACHE_TTLS.get(endpoint, DEFAULT_TTL), L1_MAX_TTL))
+        return value
+
+    def _redis_get(self, key):
+        client = self.redis_getter()
+        if client is None:
+            return MISSING
+        try:
+            raw = client.get(key)
+        except redis.RedisError as e:
+            mark_redis_down(e)
+            return MISSING
+        return MISSING if raw is None else decode_value(raw)
+
+    def _redis_set(self, endpoint, key, value, ttl):
+        client = self.redis_getter()
+        if client is None:
+            return
+        index_key = f"{KEY_PREFIX}:{endpoint}:index"
+        now = time.time()
+        try:
+            pipe = client.pipeline()
+            pipe.set(key, encode_value(value), ex=ttl)
+            # Sorted set of keys by write time: drop expired members, then evict the oldest beyond the bound
+            pipe.zadd(index_key, {key: now})
+            pipe.zremrangebyscore(index_key, "-inf", now - ttl)
+            pipe.zcard(index_key)
+            size = pipe.execute()[-1]
+            if size > self.redis_max_entries:
+                evicted = client.zpopmin(index_key, size - self.redis_max_entries)
+                if evicted:
+                    client.delete(*(member for member, _ in evicted))
+        except redis.RedisError as e:
+            mark_redis_down(e)
+
+
+amadeus_cache = AmadeusCache()
+
+
+def cached_call(endpoint, params, fetch):
+    """
+    Shortcut for amadeus_cache.get_or_fetch.
+    """
+    return amadeus_cache.get_or_fetch(endpoint, params, fetch)
+
+
+async def cached_call_async(endpoint, params, fetch):
+    """
+    Shortcut for amadeus_cache.get_or_fetch_async.
+    """
+    return await amadeus_cache.get_or_fetch_async(endpoint, params, fetch)
@@ -0,0 +1,176 @@
+import os
+import time
+import asyncio
+import logging
+import httpx
+from .rate_limiter import amadeus_limiter, RateLimited, INTERACTIVE
+from .metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
+
+AMADEUS_HOSTS = {
+    "test": "https://test.api.amadeus.com",
+    "production": "https://api.amadeus.com",
+}
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL") or AMADEUS_HOSTS[os.getenv("AMADEUS_HOSTNAME", "test")]
+
+# Default per-call timeout in seconds; individual calls can pass their own
+AMADEUS_TIMEOUT = float(os.getenv("AMADEUS_TIMEOUT", 10))
+AMADEUS_MAX_CONNECTIONS = int(os.getenv("AMADEUS_MAX_CONNECTIONS", 100))
+AMADEUS_MAX_KEEPALIVE = int(os.getenv("AMADEUS_MAX_KEEPALIVE", 20))
+AMADEUS_HTTP2 = os.getenv("AMADEUS_HTTP2", "true").lower() == "true"
+
+# Refresh the OAuth token this many seconds before Amadeus says it expires
+TOKEN_EXPIRY_MARGIN = 30
+
+
+class AmadeusAPIError(Exception):
+    """
+    Raised when Amadeus answers with an error status or can't be reached.
+    """
+
+    def __init__(self, status_code, detail):
+        super().__init__(f"[{status_code}] {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def encode_params(params):
+    """
+    Drops None values and encodes booleans the way Amadeus expects ("true"/"false").
+    """
+    return {
+        name: str(value).lower() if isinstance(value, bool) else value
+        for name, value in params.items()
+        if value is not None
+    }
+
+
+class AsyncAmadeusClient:
+    """
+    Non-blocking Amadeus client for the FastAPI handlers.
+
+    All calls share one pooled httpx.AsyncClient (keep-alive, HTTP/2) and one OAuth token, which is
+    refreshed by a single coroutine while concurrent callers wait for it.
+    """
+
+    def __init__(self, client_id, client_secret, base_url=AMADEUS_BASE_URL, timeout=AMADEUS_TIMEOUT,
+                 http2=AMADEUS_HTTP2, transport=None, limiter=None, priority=INTERACTIVE):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = base_url
+        self.timeout = timeout
+        self.http2 = http2
+        self.transport = transport
+        self.limiter = limiter
+        self.priority = priority
+        self._http = None
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv("AMADEUS_CLIENT_ID"), os.getenv("AMADEUS_CLIENT_SECRET"), limiter=amadeus_limiter)
+
+    @property
+    def http(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=AMADEUS_MAX_CONNECTIONS,
+                    max_keepalive_connections=AMADEUS_MAX_KEEPALIVE,
+                ),
+                transport=self.transport,
+            )
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def access_token(self):
+        if self._token and time.monotonic() < self._token_expires_at:
+            return self._token
+        async with self._token_lock:
+            # Another coroutine may have refreshed it while we waited for the lock
+            if self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+            response = await self._send(
+                "POST",
+                "/v1/security/oauth2/token",
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                },
+            )
+            payload = response.json()
+            self._token = payload["access_token"]
+            self._token_expires_at = time.monotonic() + int(payload.get("expires_in", 0)) - TOKEN_EXPIRY_MARGIN
+            return self._token
+
+    async def get(self, path, params, timeout=None):
+        """
+        Sends an authenticated GET and returns the decoded JSON body.
+        """
+        return (await self.get_response(path, params, timeout)).json()
+
+    async def get_body(self, path, params, timeout=None):
+        """
+        Sends an authenticated GET and returns the undecoded JSON body, for passing through as it is.
+        """
+        return (await self.get_response(path, params, timeout)).content
+
+    async def get_response(self, path, params, timeout=None):
+        if self.limiter is not None:
+            try:
+                await self.limiter.acquire_async(self.priority)
+            except RateLimited as e:
+                raise AmadeusAPIError(429, str(e)) from e
+        for attempt in range(2):
+            token = await self.access_token()
+            try:
+                return await self._send(
+                    "GET",
+                    path,
+                    params=encode_params(params),
+                    headers={"Authorization": f"Bearer {token}"},
+                    timeout=timeout or self.timeout,
+                )
+            except AmadeusAPIError as error:
+                # Token revoked or expired early: drop it and retry once with a fresh one
+                if error.status_code != 401 or attempt:
+                    raise
+                self._token = None
+
+    async def locations(self, timeout=None, **params):
+        return (await self.get("/v1/reference-data/locations", params, timeout))["data"]
+
+    async def flight_destinations_body(self, timeout=None, **params):
+        """
+        The flight-destinations response body as Amadeus sent it: {"data": [...], "dictionaries": ..., "meta": ...}.
+        """
+        return await self.get_body("/v1/shopping/flight-destinations", params, timeout)
+
+    async def flight_offers(self, timeout=None, **params):
+        return (await self.get("/v2/shopping/flight-offers", params, timeout))["data"]
+
+    async def _send(self, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, **kwargs)
+        except httpx.TimeoutException as e:
+            observe_upstream("amadeus", path, "timeout", started)
+            raise AmadeusAPIError(504, f"Timed out calling Amadeus: {e}") from e
+        except httpx.HTTPError as e:
+            observe_upstream("amadeus", path, "error", started)
+            raise AmadeusAPIError(502, f"Could not reach Amadeus: {e}") from e
+        observe_upstream("amadeus", path, response.status_code, started)
+        if response.status_code >= 400:
+            raise AmadeusAPIError(response.status_code, response.text)
+        return response
@@ -1,38 +1,124 @@
 from fastapi import Depends, HTTPException, Request
 from jose import JWTError, jwt
 import os
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from ..database import SessionLocal
+from ..database import SessionLocal, engine, read_engine, get_read_db
 from ..models import User
+from ..schemas import CurrentUser
+from ..amadeus_cache import TTLCache, MISSING
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Resolved identities are reused for at most this long (and never past the token's own expiry),
+# which also bounds how long another process can keep serving a logged-out token
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+
+class UserCache:
+    """
+    Bounded token -> CurrentUser cache, so authenticated requests don't each query the users table.
+
+    Invalidating a user records when it happened, and entries cached before that are refused. No entry lives
+    longer than the TTL, so invalidations older than that are forgotten and both structures stay bounded.
+    """
+
+    def __init__(self, max_entries=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = TTLCache(max_entries)
+        self._invalidated_at = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, token):
+        entry = self._entries.get(token)
+        if entry is not MISSING:
+            user, cached_at = entry
+            with self._lock:
+                invalidated_at = self._invalidated_at.get(user.email)
+            if invalidated_at is not None and cached_at <= invalidated_at:
+                self._entries.pop(token)
+                entry = MISSING
+        self.stats["misses" if entry is MISSING else "hits"] += 1
+        return None if entry is MISSING else entry[0]
+
+    def set(self, token, user, expires_at):
+        ttl = min(self.ttl, expires_at - time.time())
+        if ttl > 0:
+            self._entries.set(token, (user, time.monotonic()), ttl)
+
+    def invalidate_token(self, token):
+        self._entries.pop(token)
+
+    def invalidate_user(self, email):
+        now = time.monotonic()
+        with self._lock:
+            self._invalidated_at[email] = now
+            self._invalidated_at.move_to_end(email)
+            while self._invalidated_at and next(iter(self._invalidated_at.values())) <= now - self.ttl:
+                self._invalidated_at.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            self._invalidated_at.clear()
+
+    def cache_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
 
-def get_current_user(request: Request, db: Session = Depends(get_db)):
+user_cache = UserCache()
+
+
+@event.listens_for(User, "after_delete")
+def forget_deleted_user(mapper, connection, target):
+    user_cache.invalidate_user(target.email)
+
+
+def find_user(db, email):
+    """
+    Looks the user up on the read session, falling back to the primary when the replica hasn't caught up
+    with a registration yet.
+    """
+    db_user = db.query(User).filter(User.email == email).first()
+    if db_user is None and read_engine is not engine:
+        with SessionLocal() as primary:
+            db_user = primary.query(User).filter(User.email == email).first()
+    return db_user
+
+
+def get_current_user(request: Request, db: Session = Depends(get_read_db)):
     # Get the token from the cookies
-    print("Cookies received:", request.cookies)
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Access token missing")
 
+    user = user_cache.get(token)
+    if user is not None:
+        return user
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        
+
         # Fetch user from the database using the email in the payload
-        user = db.query(User).filter(User.email == email).first()
-        if user is None:
+        db_user = find_user(db, email)
+        if db_user is None:
             raise HTTPException(status_code=401, detail="User not found")
-        
+
+        user = CurrentUser(id=db_user.id, email=db_user.email)
+        user_cache.set(token, user, payload.get("exp", 0))
         return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor; each +1 doubles the time per hash
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+# Threads doing bcrypt work (bcrypt releases the GIL, so these run in parallel on separate cores)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+
+# Hashes allowed to be running or waiting at once; beyond this new requests are turned away
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 4))
+
+
+class HashingBusy(Exception):
+    """
+    Raised when the password hashing queue is full.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, bounded thread pool so a burst of logins can use at most `workers` cores
+    and queue at most `max_pending` requests, instead of tying up the threads that serve every other route.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.stats = {"pending": 0, "running": 0, "completed": 0, "rejected": 0, "total_wait_ms": 0.0, "total_hash_ms": 0.0}
+
+    def hash(self, password):
+        return self._run(self.context.hash, password)
+
+    def verify(self, password, hashed_password):
+        return self._run(self.context.verify, password, hashed_password)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected", 1)
+            logger.debug(f"Password hashing queue full ({self.max_pending} pending), rejecting request")
+            raise HashingBusy()
+        self._count("pending", 1)
+        try:
+            return self._executor.submit(self._timed, time.perf_counter(), func, *args).result()
+        finally:
+            self._count("pending", -1)
+            self._slots.release()
+
+    def _timed(self, submitted, func, *args):
+        started = time.perf_counter()
+        self._count("running", 1)
+        try:
+            return func(*args)
+        finally:
+            self._count("running", -1)
+            self._count("completed", 1)
+            self._count("total_wait_ms", (started - submitted) * 1000)
+            self._count("total_hash_ms", (time.perf_counter() - started) * 1000)
+
+    def _count(self, name, amount):
+        with self._lock:
+            self.stats[name] += amount
+
+    def hashing_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        # Requests accepted but not yet picked up by a worker thread
+        stats["queued"] = stats["pending"] - stats["running"]
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
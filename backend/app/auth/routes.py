@@ -2,17 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import SessionLocal,get_db
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 import os
 from .security import create_access_token, create_refresh_token
-from .dependencies import get_current_user
+from .dependencies import get_current_user, user_cache
+from .hashing import password_hasher, HashingBusy
 from fastapi.responses import JSONResponse
 from fastapi import Response, Request
 from datetime import timedelta
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
@@ -26,7 +25,10 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email is already registered")
 
-    hashed_password = pwd_context.hash(user.password)
+    try:
+        hashed_password = password_hasher.hash(user.password)
+    except HashingBusy:
+        raise HTTPException(status_code=503, detail="Too many sign-ups in progress, please retry", headers={"Retry-After": "1"})
     db_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
@@ -38,7 +40,11 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=schemas.Token)
 def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
-    if db_user is None or not pwd_context.verify(user.password, db_user.hashed_password):
+    try:
+        valid = db_user is not None and password_hasher.verify(user.password, db_user.hashed_password)
+    except HashingBusy:
+        raise HTTPException(status_code=503, detail="Too many logins in progress, please retry", headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     access_token = create_access_token(data={"sub": db_user.email})
@@ -67,7 +73,9 @@ def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/logout")
-def logout(response: Response, current_user: str = Depends(get_current_user)):
+def logout(request: Request, response: Response, current_user: str = Depends(get_current_user)):
+    # The token stays valid until it expires, so stop resolving it from the cache now
+    user_cache.invalidate_token(request.cookies.get("access_token"))
     # Remove access_token and refresh_token cookies on logout
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
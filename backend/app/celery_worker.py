@@ -1,36 +1,99 @@
-from celery import Celery
+from celery import Celery, group
+from celery.signals import worker_init, worker_process_shutdown, after_setup_logger, after_setup_task_logger
 from celery.utils.log import get_task_logger
 import os
+import time
 import logging
 from celery.schedules import crontab
+from collections import defaultdict
 from datetime import datetime, timedelta
+import math
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.models import FlightNotification, User
-from app.database import SessionLocal
-from app.email_service import send_email
+from sqlalchemy import select, update
+from app.models import FlightNotification, User, EmailOutbox
+from app.database import SessionLocal, insert_ignoring_conflicts
+from app.email_service import send_batch
+from app.amadeus_cache import cached_call
+from app.rate_limiter import amadeus_limiter, BACKGROUND
+from app.redis_client import REDIS_URL
+from app.scheduling import compute_next_due_at
+from app.price_history import summarize_offers, record_observations, ensure_partitions
+from app.offers import parse_offers, filter_offers_by_price
+from app.email_templates import render_alert_email
+from app.metrics import (
+    CYCLE_DURATION,
+    NOTIFICATIONS_DUE,
+    ALERTS_PROCESSED,
+    PROMETHEUS_MULTIPROC_DIR,
+    db_stage,
+    observe_upstream,
+    clear_multiproc_dir,
+    start_worker_metrics_server,
+)
+from app.profiling import connect_task_profiling
+from app.logging_setup import setup_logging, stop_logging
 from amadeus import Client, ResponseError
-import re
 
 # Initialize Celery
-celery = Celery("worker", broker="redis://redis:6379/0", backend="redis://redis:6379/0")
+celery = Celery("worker", broker=REDIS_URL, backend=REDIS_URL)
 
-# Configure logging
-LOG_DIR = "app/logs"
-os.makedirs(LOG_DIR, exist_ok=True)  # Ensure logs directory exists
-file_handler = logging.FileHandler(os.path.join(LOG_DIR, "celery_worker.log"))
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-file_handler.setFormatter(formatter)
+# Configure logging: JSON lines to app/logs/celery_worker.log, written off the task thread
+log_queue_handler = setup_logging("celery_worker.log")
 
 logger = get_task_logger(__name__)
 logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
 
-# Amadeus API Client
-amadeus = Client(
-    client_id=os.getenv("AMADEUS_CLIENT_ID"),
-    client_secret=os.getenv("AMADEUS_CLIENT_SECRET"),
-)
+
+@after_setup_logger.connect
+@after_setup_task_logger.connect
+def attach_log_queue(logger=None, **kwargs):
+    # Celery replaces the root handlers and stops task loggers propagating, so the queue is attached again
+    if log_queue_handler not in logger.handlers:
+        logger.addHandler(log_queue_handler)
+
+# Amadeus API Client, built on first use so importing the module doesn't need the credentials
+amadeus = None
+
+
+def get_amadeus():
+    global amadeus
+    if amadeus is None:
+        amadeus = Client(
+            client_id=os.getenv("AMADEUS_CLIENT_ID"),
+            client_secret=os.getenv("AMADEUS_CLIENT_SECRET"),
+        )
+    return amadeus
+
+@worker_init.connect
+def serve_worker_metrics(**kwargs):
+    if PROMETHEUS_MULTIPROC_DIR:
+        clear_multiproc_dir()
+    start_worker_metrics_server()
+
+
+@worker_process_shutdown.connect
+def discard_child_metrics(pid=None, **kwargs):
+    # Drops the exited prefork child's live gauges from the merged view
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+@worker_process_shutdown.connect
+def flush_child_logs(**kwargs):
+    # Prefork children leave through os._exit, which skips atexit, so the queue is written out here
+    stop_logging()
+
+
+connect_task_profiling()
+
+
+# Outgoing mail has its own queue so slow delivery never holds up flight searches
+EMAIL_QUEUE = "email"
+celery.conf.task_routes = {
+    "app.celery_worker.relay_outbox": {"queue": EMAIL_QUEUE},
+}
 
 # Celery Beat Schedule
 celery.conf.beat_schedule = {
@@ -38,49 +101,57 @@ celery.conf.beat_schedule = {
         "task": "app.celery_worker.check_and_send_notifications",
         "schedule": crontab(minute="*"),  # Every minute
     },
+    "relay-outbox-every-minute": {
+        "task": "app.celery_worker.relay_outbox",
+        "schedule": crontab(minute="*"),
+    },
+    "ensure-price-partitions-daily": {
+        "task": "app.celery_worker.ensure_price_partitions",
+        "schedule": crontab(minute=0, hour=0),
+    },
 }
 
 
+# Number of due notifications claimed per query
+DUE_BATCH_SIZE = int(os.getenv("DUE_BATCH_SIZE", 500))
+
+# Maximum number of notifications handed to one worker task
+SHARD_SIZE = int(os.getenv("NOTIFICATION_SHARD_SIZE", 100))
+
+# Outbox relay: rows sent per SendGrid round and attempts before a row is left for inspection
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+
+# How long a claim lasts; rows whose shard never finishes become due again after it
+CLAIM_LEASE = timedelta(seconds=int(os.getenv("CLAIM_LEASE_SECONDS", 600)))
+
+
 @celery.task(bind=True, max_retries=3, default_retry_delay=60)
 def check_and_send_notifications(self):
+    """
+    Dispatcher run by beat: claims the due notifications and fans them out as a group of shard tasks,
+    so the work spreads over every celery_worker replica and the tick itself stays short.
+    """
     db: Session = SessionLocal()
     try:
-        now = datetime.utcnow()
-        notifications = db.query(FlightNotification).filter(
-            FlightNotification.is_active == True,
-            or_(
-                FlightNotification.last_notification.is_(None),
-                FlightNotification.last_notification <= now
-            )
-        ).all()
+        with CYCLE_DURATION.time():
+            now = datetime.utcnow().replace(microsecond=0)
+            claimed_until = now + CLAIM_LEASE
+            shards = []
+            while True:
+                with db_stage("claim"):
+                    claimed = claim_due_notifications(db, now, claimed_until)
+                NOTIFICATIONS_DUE.inc(len(claimed))
+                shards.extend(build_shards(claimed))
+                if len(claimed) < DUE_BATCH_SIZE:
+                    break
 
-        # Post-process notifications with Python logic for frequency and unit
-        filtered_notifications = [
-            n for n in notifications
-            if n.last_notification is None or
-               (n.last_notification + get_timedelta(n.frequency, n.frequency_unit) <= now)
-        ]
-
-        for notification in filtered_notifications:
-            try:
-                logger.info(f"Processing notification {notification.id}")
-                flights = search_flights(
-                    origin=notification.origin,
-                    destination=notification.destination,
-                    departure_date=notification.departure_date,
-                    max_price=notification.max_price,
-                )
-                if flights:
-                    user = db.query(User).filter(User.id == notification.user_id).first()
-                    if user:
-                        email_body = format_email_body(flights)
-                        send_email(user.email, "Flight Price Alert", email_body)
-                        logger.info(f"Email sent to {user.email} for notification {notification.id}")
-                notification.last_notification = now
-                db.commit()
-            except Exception as e:
-                logger.error(f"Error processing notification {notification.id}: {e}")
-                db.rollback()
+            if shards:
+                group(
+                    process_notification_shard.s(notification_ids, claimed_until.isoformat())
+                    for notification_ids in shards
+                ).apply_async()
+        logger.info(f"Dispatched {sum(map(len, shards))} due notifications in {len(shards)} shards")
     except Exception as e:
         logger.error(f"Task failed: {e}")
         raise self.retry(exc=e)
@@ -88,108 +159,276 @@ def check_and_send_notifications(self):
         db.close()
 
 
-def search_flights(origin, destination, departure_date, max_price):
+@celery.task(bind=True, max_retries=3, default_retry_delay=60)
+def process_notification_shard(self, notification_ids, claimed_until):
     """
-    Calls Amadeus API to search for flights.
+    Processes one shard of claimed notifications.
+    Rows whose claim has since expired and been taken by a later dispatch are skipped.
     """
+    db: Session = SessionLocal()
     try:
-        response = amadeus.shopping.flight_offers_search.get(
-            originLocationCode=origin,
-            destinationLocationCode=destination,
-            departureDate=departure_date,
-            maxPrice=int(max_price) if max_price else None,
-            adults=1  # 1 adult for simplicity
-        )
-        return response.data  # List of flight offers
-    except ResponseError as e:
-        logger.error(f"Amadeus API error: {str(e)}")
-        return []
+        with db_stage("load_shard"):
+            notifications = db.query(FlightNotification).filter(
+                FlightNotification.id.in_(notification_ids),
+                FlightNotification.next_due_at == datetime.fromisoformat(claimed_until),
+            ).order_by(FlightNotification.id).all()
+        process_notifications(db, notifications, datetime.utcnow())
+    except Exception as e:
+        logger.error(f"Shard failed: {e}")
+        raise self.retry(exc=e)
+    finally:
+        db.close()
 
 
-def format_email_body(flights):
-    """
-    Formats flight details into a readable email body, presenting the cheapest and shortest duration flights.
-    """
-    if not flights:
-        return "No flights found matching your criteria."
-    logger.info(f"Format email body")
-
-    # Sort flights by price (cheapest first) and duration (shortest first)
-    cheapest_flights = sorted(flights, key=lambda f: float(f["price"]["total"]))[:5]
-    shortest_flights = sorted(flights, key=lambda f: sum(
-        int(segment["duration"].replace("PT", "").replace("H", "").replace("M", ""))
-        for segment in f["itineraries"][0]["segments"]
-    ))[:5]
-
-    email_body = "Here are the flights matching your criteria:\n\n"
-
-    # Add cheapest flights
-    email_body += "Cheapest Flights:\n"
-    for flight in cheapest_flights:
-        origin = flight["itineraries"][0]["segments"][0]["departure"]["iataCode"]
-        destination = flight["itineraries"][0]["segments"][-1]["arrival"]["iataCode"]
-        departure_time = flight["itineraries"][0]["segments"][0]["departure"]["at"]
-        duration = flight["itineraries"][0]["duration"]
-        price = flight["price"]["total"]
-        currency = flight["price"]["currency"]
-        booking_link = flight.get("meta", {}).get("links", {}).get("self", "No link available")
-
-        email_body += (
-            f"From: {origin} to {destination}\n"
-            f"Departure: {departure_time}\n"
-            f"Duration: {format_duration(duration)}\n"
-            f"Price: {price} {currency}\n"
-            f"Book here: {booking_link}\n"
-            f"{'-' * 40}\n"
+def claim_due_notifications(db, now, claimed_until, batch_size=DUE_BATCH_SIZE):
+    """
+    Claims up to batch_size due notifications by pushing their next_due_at to claimed_until, and returns
+    (id, origin, destination, departure_date) for each. SKIP LOCKED lets concurrent dispatchers claim
+    disjoint rows, and claimed_until doubles as the token a shard uses to check it still owns a row.
+    """
+    due = (
+        select(FlightNotification.id)
+        .where(FlightNotification.is_active == True, FlightNotification.next_due_at <= now)
+        .order_by(FlightNotification.next_due_at, FlightNotification.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.execute(
+        update(FlightNotification)
+        .where(FlightNotification.id.in_(due.scalar_subquery()))
+        .values(next_due_at=claimed_until)
+        .returning(
+            FlightNotification.id,
+            FlightNotification.origin,
+            FlightNotification.destination,
+            FlightNotification.departure_date,
         )
+    ).all()
+    db.commit()
+    return claimed
 
 
-    # Add shortest duration flights
-    email_body += "Shortest Duration Flights:\n"
-    for flight in shortest_flights:
-        origin = flight["itineraries"][0]["segments"][0]["departure"]["iataCode"]
-        destination = flight["itineraries"][0]["segments"][-1]["arrival"]["iataCode"]
-        departure_time = flight["itineraries"][0]["segments"][0]["departure"]["at"]
-        duration = flight["itineraries"][0]["duration"]
-        price = flight["price"]["total"]
-        currency = flight["price"]["currency"]
-        booking_link = flight.get("meta", {}).get("links", {}).get("self", "No link available")
-
-        email_body += (
-            f"From: {origin} to {destination}\n"
-            f"Departure: {departure_time}\n"
-            f"Duration: {format_duration(duration)}\n"
-            f"Price: {price} {currency}\n"
-            f"Book here: {booking_link}\n"
-            f"{'-' * 40}\n"
-        )
+def build_shards(claimed, shard_size=SHARD_SIZE):
+    """
+    Packs claimed notifications into lists of ids of at most shard_size, keeping each route in one shard
+    where it fits so the route is still searched only once.
+    """
+    shards = []
+    current = []
+    for route_notifications in group_notifications_by_route(claimed).values():
+        ids = sorted(n.id for n in route_notifications)
+        if len(current) + len(ids) > shard_size and current:
+            shards.append(current)
+            current = []
+        for start in range(0, len(ids), shard_size):
+            chunk = ids[start:start + shard_size]
+            if len(chunk) == shard_size:
+                shards.append(chunk)
+            else:
+                current.extend(chunk)
+    if current:
+        shards.append(current)
+    return shards
+
+
+def process_notifications(db, notifications, now):
+    """
+    Searches each route of the batch once and writes an outbox email for every subscriber whose max_price
+    has matching offers. The outbox rows and the last_notification/next_due_at updates for the whole
+    batch are committed together, so a crash can neither lose an email nor enqueue it twice.
+    """
+    outbox_rows = []
+    observations = []
+    processed = defaultdict(list)
+    routes = group_notifications_by_route(notifications)
+    user_ids = {n.user_id for n in notifications}
+    with db_stage("load_users"):
+        users = {u.id: u for u in db.query(User).filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    logger.info(f"Processing {len(notifications)} notifications across {len(routes)} routes")
+
+    for (origin, destination, departure_date), route_notifications in routes.items():
+        search_max_price = group_max_price(route_notifications)
+        try:
+            # Parsed once per route; every subscriber's filtering and ranking works on these
+            offers = parse_offers(search_flights(
+                origin=origin,
+                destination=destination,
+                departure_date=departure_date,
+                max_price=search_max_price,
+            ))
+            observation = summarize_offers(origin, destination, departure_date, offers, now, search_max_price)
+            if observation:
+                observations.append(observation)
+        except Exception as e:
+            logger.error("Error searching route %s-%s on %s: %s", origin, destination, departure_date, e)
+            ALERTS_PROCESSED.labels("search_failed").inc(len(route_notifications))
+            continue
+
+        for notification in route_notifications:
+            try:
+                next_due_at = compute_next_due_at(notification, now)
+                matching_offers = filter_offers_by_price(offers, notification.max_price)
+                user = users.get(notification.user_id)
+                if matching_offers and user:
+                    outbox_rows.append({
+                        "notification_id": notification.id,
+                        "to_email": user.email,
+                        "subject": "Flight Price Alert",
+                        "content": render_alert_email(notification, matching_offers),
+                        # The claimed due slot identifies this run of the notification
+                        "dedupe_key": f"{notification.id}:{notification.next_due_at.isoformat()}",
+                        "created_at": now,
+                    })
+                    ALERTS_PROCESSED.labels("queued").inc()
+                else:
+                    ALERTS_PROCESSED.labels("no_match").inc()
+                processed[next_due_at].append(notification.id)
+            except Exception as e:
+                logger.error("Error processing notification %s: %s", notification.id, e)
+                ALERTS_PROCESSED.labels("error").inc()
+
+    # One UPDATE per distinct next_due_at and one multi-row INSERT, committed once
+    with db_stage("commit"):
+        for next_due_at, notification_ids in processed.items():
+            db.execute(
+                update(FlightNotification)
+                .where(FlightNotification.id.in_(notification_ids))
+                .values(last_notification=now, next_due_at=next_due_at)
+            )
+        if outbox_rows:
+            db.execute(insert_ignoring_conflicts(db, EmailOutbox, ["dedupe_key"]), outbox_rows)
+        db.commit()
+    logger.info(f"Committed {sum(map(len, processed.values()))} notifications and {len(outbox_rows)} outbox emails")
+
+    if outbox_rows:
+        relay_outbox.delay()
+
+    # Price history is best effort and kept out of the alert transaction
+    try:
+        with db_stage("price_history"):
+            record_observations(db, observations)
+    except Exception as e:
+        logger.error(f"Failed to record {len(observations)} price observations: {e}")
+        db.rollback()
+
+
+@celery.task
+def ensure_price_partitions():
+    """
+    Keeps monthly price_observations partitions created ahead of the rows that will land in them.
+    """
+    db: Session = SessionLocal()
+    try:
+        ensure_partitions(db, datetime.utcnow().date())
+    finally:
+        db.close()
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=60)
+def relay_outbox(self):
+    """
+    Drains pending outbox emails through SendGrid. Runs on the email queue after each committed batch
+    and from beat as a sweeper for anything left behind.
+    """
+    db: Session = SessionLocal()
+    try:
+        sent = relay_pending_emails(db)
+        logger.info(f"Relayed {sent} outbox emails")
+    except Exception as e:
+        logger.error(f"Outbox relay failed: {e}")
+        raise self.retry(exc=e)
+    finally:
+        db.close()
 
-    return email_body
 
+def relay_pending_emails(db, batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Sends pending outbox rows in batches and marks them sent, or records the error for a later attempt.
+    Rows are locked with SKIP LOCKED so concurrent relays never send the same email. Returns the number sent.
+    """
+    sent = 0
+    while True:
+        with db_stage("relay_lock"):
+            pending = db.query(EmailOutbox).filter(
+                EmailOutbox.sent_at.is_(None),
+                EmailOutbox.attempts < OUTBOX_MAX_ATTEMPTS,
+            ).order_by(EmailOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not pending:
+            return sent
+
+        rows = {row.id: row for row in pending}
+        results = send_batch([
+            {"id": row.id, "to_email": row.to_email, "subject": row.subject, "content": row.content}
+            for row in pending
+        ])
+        now = datetime.utcnow()
+        for result in results:
+            for message in result["messages"]:
+                row = rows[message["id"]]
+                row.attempts += 1
+                if "error" in result:
+                    row.last_error = result["error"]
+                else:
+                    row.sent_at = now
+                    sent += 1
+        with db_stage("relay_commit"):
+            db.commit()
+        if any("error" in result for result in results):
+            # Leave failed rows for the next run rather than hammering SendGrid
+            return sent
 
-def get_timedelta(frequency, unit):
+
+def search_flights(origin, destination, departure_date, max_price):
     """
-    Converts frequency and unit to a timedelta object.
+    Calls Amadeus API to search for flights, going through the shared response cache.
+    Cache misses wait for a background token from the shared rate limiter, so the sweep yields to user searches.
+    Raises RateLimited if none comes within AMADEUS_BACKGROUND_MAX_WAIT; the route is then retried once its claim expires.
     """
-    unit_mapping = {
-        "minutes": timedelta(minutes=frequency),
-        "hours": timedelta(hours=frequency),
-        "days": timedelta(days=frequency),
-        "weeks": timedelta(weeks=frequency),
+    params = {
+        "originLocationCode": origin,
+        "destinationLocationCode": destination,
+        "departureDate": departure_date,
+        "maxPrice": int(max_price) if max_price else None,
+        "adults": 1,  # 1 adult for simplicity
     }
-    if unit not in unit_mapping:
-        raise ValueError(f"Invalid frequency unit: {unit}")
-    return unit_mapping[unit]
-
-
-def format_duration(duration_iso):
-    logger.info(f"Format Duration")
-    # Extraer horas y minutos usando expresiones regulares
-    match = re.match(r"PT(?:(\d+)H)?(?:(\d+)M)?", duration_iso)
-    if not match:
-        return "Unknown duration"
-    
-    hours = match.group(1) or "0"
-    minutes = match.group(2) or "0"
-    return f"{int(hours)}h {int(minutes)}m"
+    # The SDK would send a missing limit as maxPrice=None
+    params = {name: value for name, value in params.items() if value is not None}
+
+    def fetch():
+        amadeus_limiter.acquire(BACKGROUND)
+        started = time.perf_counter()
+        try:
+            data = get_amadeus().shopping.flight_offers_search.get(**params).data
+        except ResponseError as e:
+            observe_upstream("amadeus", "/v2/shopping/flight-offers", getattr(e.response, "status_code", None) or "error", started)
+            raise
+        observe_upstream("amadeus", "/v2/shopping/flight-offers", 200, started)
+        return data
 
+    try:
+        # List of flight offers
+        return cached_call("flight_offers", params, fetch)
+    except ResponseError as e:
+        logger.error(f"Amadeus API error: {str(e)}")
+        return []
+
+
+def group_notifications_by_route(notifications):
+    """
+    Groups notifications by (origin, destination, departure_date) so each route is searched once per cycle.
+    """
+    routes = defaultdict(list)
+    for notification in notifications:
+        routes[(notification.origin, notification.destination, notification.departure_date)].append(notification)
+    return routes
+
+
+def group_max_price(notifications):
+    """
+    Returns the price ceiling to search a route with: the highest max_price in the group,
+    or None when any subscriber has no limit. Rounded up so local filtering stays authoritative.
+    """
+    prices = [n.max_price for n in notifications]
+    if not prices or any(price is None for price in prices):
+        return None
+    return math.ceil(max(prices))
@@ -1,51 +1,178 @@
+"""
+Bulk load generator for load tests and index work.
+
+Streams users, flight_notifications and flight_destinations_dummy rows into PostgreSQL with COPY, in chunks,
+so millions of rows load in minutes without building them all in memory. Routes are drawn from the bundled
+airport dataset with Zipfian popularity, and the same --seed always produces the same rows.
+
+    cd backend && python -m app.dummy_records_generator --users 100000 --notifications 2000000 \\
+        --destinations 1000000 --routes 5000 --skew 1.1 --seed 42
+"""
+import io
+import csv
 import random
+import logging
+import argparse
 from datetime import datetime, timedelta
-from app.models import FlightDestinationDummy  # Import your model
-from app.database import SessionLocal  # Import your session management
-
-# Helper function to generate random data
-def generate_dummy_data(db):
-    origins = ['MAD', 'LON', 'JFK', 'LAX', 'PAR']
-    destinations = ['BCN', 'AMS','MIA', 'SFO', 'ROM']
-    today = datetime.today()
-
-    for _ in range(1000):  # Generate 1000 records
-        origin = random.choice(origins)
-        destination = random.choice(destinations)
-        departure_date = today + timedelta(days=random.randint(1, 180))
-        price = round(random.uniform(50, 1000), 2)
-        max_price = round(random.uniform(50, 2000), 2)
-        one_way = random.choice([True, False])
-        duration = random.randint(3, 14)  # Random trip duration between 3 and 14 days
-        non_stop = random.choice([True, False])
-        view_by = 'DURATION'
-
-        # Create a new FlightDestinationDummy instance
-        flight = FlightDestinationDummy(
-            origin=origin,
-            destination=destination,
-            departure_date=departure_date,
-            price=price,
-            max_price=max_price,
-            one_way=one_way,
-            duration=duration,
-            non_stop=non_stop,
-            view_by=view_by
+from itertools import accumulate, islice
+from passlib.context import CryptContext
+from sqlalchemy import text
+from app.database import engine
+from app.airport_index import AIRPORT_DATASET_PATH
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50000
+
+# Every generated user gets this password, so load tests can log in as any of them
+DUMMY_PASSWORD = "Dummy-Password-1234!"
+
+USER_COLUMNS = ("id", "email", "hashed_password")
+NOTIFICATION_COLUMNS = (
+    "user_id", "origin", "destination", "departure_date", "max_price", "frequency", "frequency_unit",
+    "is_active", "next_due_at",
+)
+DESTINATION_COLUMNS = (
+    "origin", "destination", "departure_date", "price", "max_price", "one_way", "duration", "non_stop", "view_by",
+)
+
+FREQUENCIES = [(1, "hours"), (6, "hours"), (12, "hours"), (1, "days"), (1, "days"), (3, "days"), (1, "weeks")]
+MAX_PRICES = [None, 50, 75, 100, 150, 200, 300, 500, 800]
+
+
+def load_airport_codes(path=AIRPORT_DATASET_PATH):
+    with open(path, newline="", encoding="utf-8") as f:
+        return sorted(row["iata_code"] for row in csv.DictReader(f) if row["sub_type"] == "AIRPORT")
+
+
+def make_routes(count, rng, airports):
+    """
+    Returns `count` distinct (origin, destination) pairs in popularity order (most popular first).
+    """
+    routes = [(origin, destination) for origin in airports for destination in airports if origin != destination]
+    if count > len(routes):
+        raise ValueError(f"Only {len(routes)} routes exist between {len(airports)} airports")
+    return rng.sample(routes, count)
+
+
+def zipf_cum_weights(count, skew):
+    """
+    Cumulative weights for random.choices: the route at rank r is picked with probability proportional to 1 / r**skew.
+    """
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class RouteSampler:
+    def __init__(self, routes, skew, rng):
+        self.routes = routes
+        self.cum_weights = zipf_cum_weights(len(routes), skew)
+        self.rng = rng
+
+    def sample(self, k):
+        return self.rng.choices(self.routes, cum_weights=self.cum_weights, k=k)
+
+
+def user_rows(count, first_id, hashed_password):
+    for user_id in range(first_id, first_id + count):
+        yield (user_id, f"loadtest{user_id}@example.com", hashed_password)
+
+
+def notification_rows(count, user_ids, sampler, rng, today):
+    """
+    Yields notification rows; due times are spread over the next day so the scheduler sees a steady trickle.
+    """
+    first_user, last_user = user_ids
+    for origin, destination in sampler.sample(count):
+        frequency, unit = rng.choice(FREQUENCIES)
+        yield (
+            rng.randint(first_user, last_user),
+            origin,
+            destination,
+            (today + timedelta(days=rng.randint(7, 240))).date().isoformat(),
+            rng.choice(MAX_PRICES),
+            frequency,
+            unit,
+            rng.random() < 0.95,
+            today + timedelta(seconds=rng.randrange(86400)),
+        )
+
+
+def destination_rows(count, sampler, rng, today):
+    for origin, destination in sampler.sample(count):
+        price = round(rng.lognormvariate(5, 0.6), 2)
+        yield (
+            origin,
+            destination,
+            (today + timedelta(days=rng.randint(1, 180))).date().isoformat(),
+            price,
+            round(price * rng.uniform(1, 2), 2),
+            rng.random() < 0.4,
+            rng.randint(3, 14),
+            rng.random() < 0.3,
+            "DURATION",
         )
 
-        # Add the record to the session
-        db.add(flight)
 
-    # Commit the transaction to the database
-    db.commit()
+def copy_rows(connection, table, columns, rows, chunk_size=CHUNK_SIZE):
+    """
+    Streams rows into table with COPY ... FROM STDIN, one chunk at a time. Returns the number of rows copied.
+    """
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = connection.connection.cursor()
+    copied = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return copied
+        buffer = io.StringIO()
+        # None becomes an empty unquoted field, which COPY csv reads as NULL
+        csv.writer(buffer).writerows(chunk)
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+        copied += len(chunk)
+        logger.info(f"{table}: {copied} rows copied")
+
+
+def generate(users, notifications, destinations, routes, skew, seed, chunk_size=CHUNK_SIZE):
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("The bulk loader uses COPY and needs a PostgreSQL DATABASE_URL")
+    rng = random.Random(seed)
+    sampler = RouteSampler(make_routes(routes, rng, load_airport_codes()), skew, rng)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with engine.begin() as connection:
+        first_id = connection.execute(text("SELECT COALESCE(MAX(id), 0) + 1 FROM users")).scalar()
+        hashed_password = CryptContext(schemes=["bcrypt"]).hash(DUMMY_PASSWORD)
+        copy_rows(connection, "users", USER_COLUMNS, user_rows(users, first_id, hashed_password), chunk_size)
+        # Rows were copied with explicit ids, so move the sequence past them
+        connection.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT MAX(id) FROM users))"))
+
+        if notifications:
+            if not users:
+                raise SystemExit("Notifications need users to belong to")
+            user_ids = (first_id, first_id + users - 1)
+            copy_rows(connection, "flight_notifications", NOTIFICATION_COLUMNS,
+                      notification_rows(notifications, user_ids, sampler, rng, today), chunk_size)
+        copy_rows(connection, "flight_destinations_dummy", DESTINATION_COLUMNS,
+                  destination_rows(destinations, sampler, rng, today), chunk_size)
+        connection.execute(text("ANALYZE users, flight_notifications, flight_destinations_dummy"))
+
 
 def main():
-    db = SessionLocal()  # Get the database session
-    try:
-        generate_dummy_data(db)
-        print("Dummy data generation complete.")
-    finally:
-        db.close()  # Make sure to close the session after use
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--notifications", type=int, default=100000)
+    parser.add_argument("--destinations", type=int, default=100000, help="flight_destinations_dummy rows")
+    parser.add_argument("--routes", type=int, default=2000, help="distinct origin-destination pairs")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for route popularity; 0 is uniform")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per COPY")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    generate(args.users, args.notifications, args.destinations, args.routes, args.skew, args.seed, args.chunk_size)
+    print("Dummy data generation complete.")
+
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
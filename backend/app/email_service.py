@@ -1,25 +1,102 @@
-import sendgrid
-from sendgrid.helpers.mail import Mail, Email, To, Content
 import os
-from sendgrid import SendGridAPIClient
+import time
+import logging
+import httpx
+from .metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
 
 SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
+SENDGRID_API_HOST = os.getenv('SENDGRID_API_HOST', 'https://api.sendgrid.com')
+SENDGRID_TIMEOUT = float(os.getenv('SENDGRID_TIMEOUT', 10))
 HOST_MAIL = os.getenv('HOST_MAIL')
 
+# SendGrid accepts at most 1000 personalizations per request
+MAX_PERSONALIZATIONS = int(os.getenv('SENDGRID_MAX_PERSONALIZATIONS', 1000))
+
+_http_client = None
+
+# Per-process delivery counters, reported in the logs after each batch
+delivery_stats = {"batches": 0, "messages": 0, "failed_batches": 0, "failed_messages": 0, "total_latency_ms": 0.0}
+
+
+def get_http_client():
+    """
+    Returns the pooled client reused for every SendGrid request in this process.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            base_url=SENDGRID_API_HOST,
+            headers={"Authorization": f"Bearer {os.getenv('SENDGRID_API_KEY')}"},
+            timeout=SENDGRID_TIMEOUT,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+    return _http_client
+
+
+def build_batches(messages, max_personalizations=MAX_PERSONALIZATIONS):
+    """
+    Groups messages with the same subject and content into SendGrid payloads, one personalization per
+    recipient so recipients don't see each other. Returns (payload, messages) pairs.
+    """
+    groups = {}
+    for message in messages:
+        groups.setdefault((message["subject"], message["content"]), []).append(message)
+
+    batches = []
+    for (subject, content), grouped in groups.items():
+        for start in range(0, len(grouped), max_personalizations):
+            chunk = grouped[start:start + max_personalizations]
+            payload = {
+                "personalizations": [{"to": [{"email": m["to_email"]}]} for m in chunk],
+                "from": {"email": os.getenv("HOST_MAIL")},
+                "subject": subject,
+                "content": [{"type": "text/html", "value": content}],
+            }
+            batches.append((payload, chunk))
+    return batches
+
+
+def send_batch(messages):
+    """
+    Sends messages through SendGrid using as few requests as possible.
+    Returns one result per request with the messages it carried, its status and latency.
+    """
+    results = []
+    for payload, batch_messages in build_batches(messages):
+        started = time.perf_counter()
+        try:
+            response = get_http_client().post("/v3/mail/send", json=payload)
+            result = {"status_code": response.status_code}
+            if response.status_code != 202:
+                result["error"] = response.text
+        except httpx.HTTPError as e:
+            result = {"error": str(e)}
+        result["messages"] = batch_messages
+        result["recipients"] = [m["to_email"] for m in batch_messages]
+        result["latency_ms"] = (time.perf_counter() - started) * 1000
+        observe_upstream("sendgrid", "/v3/mail/send", result.get("status_code", "error"), started)
+        record_batch(result)
+        results.append(result)
+    return results
+
+
+def record_batch(result):
+    failed = "error" in result
+    delivery_stats["batches"] += 1
+    delivery_stats["messages"] += len(result["recipients"])
+    delivery_stats["failed_batches"] += failed
+    delivery_stats["failed_messages"] += len(result["recipients"]) if failed else 0
+    delivery_stats["total_latency_ms"] += result["latency_ms"]
+    if failed:
+        logger.error(f"SendGrid batch of {len(result['recipients'])} failed in {result['latency_ms']:.0f}ms: {result['error']}")
+    else:
+        logger.info(f"SendGrid batch of {len(result['recipients'])} sent in {result['latency_ms']:.0f}ms")
+
 
 def send_email(to_email, subject, content):
-    message = Mail(
-        from_email=os.getenv("HOST_MAIL"),
-        to_emails=to_email,
-        subject=subject,
-        html_content=content,
-    )
-    try:
-        sg = SendGridAPIClient(os.getenv("SENDGRID_API_KEY"))
-        response = sg.send(message)
-        if response.status_code == 202:
-            return {"status_code": response.status_code, "message": "Email sent successfully"}
-        else:
-            return {"status_code": response.status_code, "error": response.body.decode("utf-8")}
-    except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+    result = send_batch([{"to_email": to_email, "subject": subject, "content": content}])[0]
+    if "error" in result:
+        return {key: result[key] for key in ("status_code", "error") if key in result}
+    return {"status_code": result["status_code"], "message": "Email sent successfully"}
@@ -0,0 +1,87 @@
+import os
+from string import Template
+from .amadeus_cache import TTLCache, CACHE_TTLS, MISSING
+from .offers import cheapest, shortest, format_cents, format_minutes
+
+# Rendered offer sections kept per process; entries outlive a cycle only as long as the offers they came from
+SECTION_CACHE_MAX_ENTRIES = int(os.getenv("EMAIL_SECTION_CACHE_MAX_ENTRIES", 2048))
+SECTION_CACHE_TTL = CACHE_TTLS["flight_offers"]
+
+NO_FLIGHTS = "No flights found matching your criteria."
+
+# Nothing recipient- or subscription-specific goes in the body: everyone on a route matching the same offers
+# gets identical content, which SendGrid batching (email_service.build_batches) relies on
+HEADER = Template("Here are the flights from $origin to $destination matching your criteria:\n\n")
+OFFER = Template(
+    "From: $origin to $destination\n"
+    "Departure: $departure_at\n"
+    "Duration: $duration\n"
+    "Price: $price $currency\n"
+    "Book here: $booking_link\n"
+    + "-" * 40 + "\n"
+)
+FOOTER = Template(
+    "\nYou are receiving this alert for $origin-$destination on $departure_date. "
+    "Your price limit and check frequency are on the My Notifications page.\n"
+)
+
+section_cache = TTLCache(SECTION_CACHE_MAX_ENTRIES)
+
+
+def offer_set_key(offers):
+    """
+    Key identifying a list of offers by everything that appears in the email, so any change to the
+    offers (a new price, a different booking link) yields a new key.
+    """
+    return tuple(
+        (offer.price_cents, offer.currency, offer.duration_minutes, offer.origin,
+         offer.destination, offer.departure_at, offer.booking_link)
+        for offer in offers
+    )
+
+
+def render_offer(offer):
+    return OFFER.substitute(
+        origin=offer.origin,
+        destination=offer.destination,
+        departure_at=offer.departure_at,
+        duration=format_minutes(offer.duration_minutes),
+        price=format_cents(offer.price_cents),
+        currency=offer.currency,
+        booking_link=offer.booking_link,
+    )
+
+
+def format_email_body(offers):
+    """
+    Renders the cheapest and shortest duration flights sections. Subscribers whose offers rank the same share
+    one rendering, memoized by the ranked offers only, not by every matching offer.
+    """
+    if not offers:
+        return NO_FLIGHTS
+    by_price, by_duration = cheapest(offers), shortest(offers)
+    key = offer_set_key(by_price + by_duration)
+    body = section_cache.get(key)
+    if body is MISSING:
+        sections = ["Cheapest Flights:\n"]
+        sections.extend(render_offer(offer) for offer in by_price)
+        sections.append("Shortest Duration Flights:\n")
+        sections.extend(render_offer(offer) for offer in by_duration)
+        body = "".join(sections)
+        section_cache.set(key, body, SECTION_CACHE_TTL)
+    return body
+
+
+def render_alert_email(notification, offers):
+    """
+    Builds one subscriber's alert: the route header and footer around the shared offer sections.
+    """
+    return "".join((
+        HEADER.substitute(origin=notification.origin, destination=notification.destination),
+        format_email_body(offers),
+        FOOTER.substitute(
+            origin=notification.origin,
+            destination=notification.destination,
+            departure_date=notification.departure_date,
+        ),
+    ))
@@ -0,0 +1,184 @@
+"""
+Process-wide logging: callers only put records on an in-memory queue, and a background listener thread
+formats them as JSON lines and writes them to the log file.
+
+Messages logged with %-style arguments (logger.info("Searching %s", route)) are formatted by the listener
+when the arguments are immutable (strings, numbers, dates), so the calling thread never pays for string
+building or file I/O. Loggers listed in LOG_SAMPLE_RATES keep only that share of their INFO and DEBUG
+records; warnings and errors always go through.
+
+Threads don't survive fork, so a forked child (a Celery prefork worker, a gunicorn worker) gets its own queue
+and listener writing to the same file.
+"""
+import os
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from uuid import UUID
+from decimal import Decimal
+from datetime import date, datetime, time, timezone
+
+LOG_DIR = os.getenv("LOG_DIR", "app/logs")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").strip().upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+# logger=rate pairs, e.g. "app.main.requests=0.1,app.amadeus_cache=0.01"; a logger's children share its rate
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "app.main.requests=0.1")
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is written out as a field
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Arguments of these types can't change between the call and the listener formatting them
+IMMUTABLE_ARG_TYPES = (str, bytes, int, float, complex, bool, type(None), date, datetime, time, Decimal, UUID)
+
+
+def parse_sample_rates(value):
+    rates = {}
+    for pair in value.split(","):
+        if "=" in pair:
+            name, rate = pair.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a random `rate` share of INFO and DEBUG records from the configured loggers and their children.
+    Kept records carry sample_rate so counts can be scaled back up.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        if rate is None:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+def is_immutable(value):
+    if isinstance(value, (tuple, frozenset)):
+        return all(is_immutable(item) for item in value)
+    return isinstance(value, IMMUTABLE_ARG_TYPES)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records with immutable arguments unformatted, leaving message and traceback formatting to the
+    listener thread. Any other arguments (lists, dicts, models) could change before the listener gets to
+    them, so those messages are formatted here.
+    When the queue is full the record is dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if record.args and not (isinstance(record.args, tuple) and is_immutable(record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+queue_handler = None
+listener = None
+
+
+def start_listener(handlers):
+    global listener
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+
+def stop_logging():
+    """
+    Writes out whatever is still queued and stops the listener.
+    """
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+def restart_listener_in_child():
+    """
+    The forked child inherits the queue but not the listener thread, so its records would never be written.
+    It gets a fresh queue (records the parent had queued are the parent's to write) and its own listener.
+    """
+    if listener is not None:
+        queue_handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+        start_listener(listener.handlers)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=restart_listener_in_child)
+
+
+def setup_logging(filename, level=LOG_LEVEL, sample_rates=None):
+    """
+    Routes the root logger through the queue to LOG_DIR/filename and starts the listener.
+    Only the first call in a process configures anything; later calls, forked children included, return
+    the same handler.
+    """
+    global queue_handler
+    if queue_handler is not None:
+        return queue_handler
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    file_handler = logging.FileHandler(os.path.join(LOG_DIR, filename))
+    file_handler.setFormatter(JsonFormatter())
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(
+        parse_sample_rates(LOG_SAMPLE_RATES) if sample_rates is None else sample_rates
+    ))
+    start_listener([file_handler])
+    # Flushes whatever is still queued on a clean exit
+    atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+    return queue_handler
@@ -1,15 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+import time
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from prometheus_client import REGISTRY
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
 import logging
 from .schemas import LocationSearchRequest, FlightSearchRequest
 from .auth.routes import router as auth_router
-from amadeus import Client, ResponseError
-from fastapi.responses import JSONResponse
+from .amadeus_client import AsyncAmadeusClient, AmadeusAPIError
+from fastapi.responses import ORJSONResponse
 from typing import List
 from .notification_routes import router as notification_router
+from .price_history_routes import router as price_history_router
 from .auth.dependencies import get_current_user
+from .amadeus_cache import cached_call_async
+from .response_cache import response_cache
+from .airport_index import get_airport_index
+from .metrics import HTTP_REQUEST_DURATION, AppStatsCollector, metrics_response_body
+from .profiling import profile_requests, request_profiling_enabled
+from .logging_setup import setup_logging
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,15 +26,11 @@ load_dotenv()
 # Initialize the FastAPI app
 app = FastAPI()
 
-# Configure logging
-LOG_DIR = "app/logs"
-os.makedirs(LOG_DIR, exist_ok=True)  # Ensure logs directory exists
-logging.basicConfig(
-    filename=os.path.join(LOG_DIR, "backend.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+# Configure logging: JSON lines to app/logs/backend.log, written off the request path
+setup_logging("backend.log")
 logger = logging.getLogger(__name__)
+# Per-request lines; sampled through LOG_SAMPLE_RATES since autocomplete fires on every keystroke
+request_logger = logging.getLogger(f"{__name__}.requests")
 
 # Load the allowed origins from the environment variable
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
@@ -42,11 +47,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the dashboard read the list pagination cursor and ETag
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+REGISTRY.register(AppStatsCollector())
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template (/api/price_history, not the concrete URL) to keep the series bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_DURATION.labels(
+        request.method, route.path if route else "unmatched", str(response.status_code)
+    ).observe(time.perf_counter() - started)
+    return response
+
+# Only installed when sampling or the admin header is configured, so it costs nothing otherwise
+if request_profiling_enabled():
+    app.middleware("http")(profile_requests)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = metrics_response_body()
+    return Response(content=body, media_type=content_type)
+
 # Include the authentication routes from auth module
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(notification_router, prefix="/notify", tags=["notify"])
+app.include_router(price_history_router, prefix="/api", tags=["price_history"])
+
+@app.on_event("startup")
+def load_airport_index():
+    # Build the autocomplete index before the first request instead of on it
+    get_airport_index()
 
 # Optional: Add a basic route for testing
 @app.get("/")
@@ -54,65 +89,113 @@ def read_root():
     logger.info("Root endpoint accessed")
     return {"message": "Welcome to FastAPI!"}
 
-# Initialize Amadeus client with credentials from environment variables
-amadeus = Client(
-    client_id=os.getenv("AMADEUS_CLIENT_ID"),
-    client_secret=os.getenv("AMADEUS_CLIENT_SECRET"),
-)
+# Non-blocking Amadeus client shared by all requests of this process
+amadeus = AsyncAmadeusClient.from_env()
+
+@app.on_event("shutdown")
+async def close_amadeus_client():
+    await amadeus.aclose()
+
+# Locations returned per lookup
+LOCATION_LIMIT = 10
 
-@app.post("/api/search_location")
+def amadeus_http_error(error, detail):
+    """
+    HTTPException for a failed Amadeus call: a 429 from our limiter or Amadeus becomes a 429 with Retry-After,
+    anything else a 500 with detail.
+    """
+    if error.status_code == 429:
+        return HTTPException(status_code=429, detail="Too many searches right now, please retry", headers={"Retry-After": "1"})
+    return HTTPException(status_code=500, detail=detail)
+
+async def search_locations(keyword, sub_types, top_up=False):
+    """
+    Bundled index first; Amadeus (cached) is only asked when it has no match. With top_up, as for an explicit
+    search, fewer than LOCATION_LIMIT local matches are also completed from Amadeus, after the local ones and
+    without duplicates. Autocomplete must not top up: most keystroke prefixes have a few local matches.
+    If Amadeus fails, the local matches are still returned when there are any.
+    """
+    local = get_airport_index().search(keyword, sub_types=sub_types, limit=LOCATION_LIMIT)
+    if local and (not top_up or len(local) >= LOCATION_LIMIT):
+        return local
+    params = {"keyword": keyword, "subType": ",".join(sub_types)}
+    try:
+        remote = await cached_call_async("locations", params, lambda: amadeus.locations(**params))
+    except AmadeusAPIError as error:
+        if not local:
+            raise
+        logger.warning(f"Serving {len(local)} local locations for {keyword!r}, Amadeus failed: {error}")
+        return local
+    seen = {(location["subType"], location["iataCode"]) for location in local}
+    merged = local + [
+        location for location in remote
+        if (location.get("subType"), location.get("iataCode")) not in seen
+    ]
+    return merged[:LOCATION_LIMIT]
+
+@app.post("/api/search_location", response_class=ORJSONResponse)
 async def search_location(request: LocationSearchRequest, current_user: str = Depends(get_current_user)):
     try:
-        logger.info(f"Search location request: {request.keyword}")
-        response = amadeus.reference_data.locations.get(
-            keyword=request.keyword,
-            subType="AIRPORT",
-        )
-        return {"data": response.data}
-    except ResponseError as error:
+        request_logger.info("Search location request: %s", request.keyword)
+        return {"data": await search_locations(request.keyword, ("AIRPORT",), top_up=True)}
+    except AmadeusAPIError as error:
         logger.error(f"Failed to fetch locations: {error}")
-        raise HTTPException(status_code=500, detail="Failed to fetch locations from Amadeus API")
+        raise amadeus_http_error(error, "Failed to fetch locations from Amadeus API")
 
-@app.post("/api/flight_destinations")
-async def flight_destinations(request: FlightSearchRequest, current_user: str = Depends(get_current_user)):
+async def search_destinations(request: Request, search: FlightSearchRequest):
+    """
+    Shared by the GET and POST endpoints: answers from the response cache, which holds the encoded and
+    compressed body for each normalized search, and only asks Amadeus (through its own cache) on a miss.
+    The Amadeus body already has our {"data": [...]} shape, so it is passed through without being decoded.
+    """
     try:
-        logger.info(f"Received flight destinations request: {request.dict()}")
+        request_logger.info("Received flight destinations request: %s", search)
         params = {
-            "origin": request.origin,
-            "departureDate": request.departureDate,
-            "oneWay": request.oneWay,
-            "maxPrice": request.maxPrice,
-            "viewBy": request.viewBy,
+            "origin": search.origin,
+            "departureDate": search.departureDate,
+            "oneWay": search.oneWay,
+            "maxPrice": search.maxPrice,
+            "viewBy": search.viewBy,
         }
-        if request.duration:
-            params["duration"] = request.duration
-        if request.nonStop:
-            params["nonStop"] = request.nonStop
-
-        logger.info(f"Sending parameters to Amadeus: {params}")
-        response = amadeus.shopping.flight_destinations.get(**params)
-        return {"data": response.data}
-    except ResponseError as error:
+        if search.duration:
+            params["duration"] = search.duration
+        if search.nonStop:
+            params["nonStop"] = search.nonStop
+
+        def fetch_body():
+            request_logger.info("Sending parameters to Amadeus: %s", params)
+            return cached_call_async("flight_destinations_body", params, lambda: amadeus.flight_destinations_body(**params))
+
+        return await response_cache.respond_body(request, "flight_destinations", params, fetch_body)
+    except AmadeusAPIError as error:
         logger.error(f"Amadeus API error: {error}")
-        raise HTTPException(status_code=500, detail="Failed to fetch flight destinations from Amadeus API")
+        raise amadeus_http_error(error, "Failed to fetch flight destinations from Amadeus API")
+
+@app.get("/api/flight_destinations")
+async def flight_destinations_query(request: Request, search: FlightSearchRequest = Depends(), current_user: str = Depends(get_current_user)):
+    """
+    Same search as the POST, with the criteria in the query string so browsers can cache and revalidate it.
+    """
+    return await search_destinations(request, search)
+
+@app.post("/api/flight_destinations")
+async def flight_destinations(request: Request, search: FlightSearchRequest, current_user: str = Depends(get_current_user)):
+    return await search_destinations(request, search)
 
-@app.get("/api/airport_autocomplete")
+@app.get("/api/airport_autocomplete", response_class=ORJSONResponse)
 async def airport_autocomplete(term: str = Query(...), current_user: str = Depends(get_current_user)):
     try:
-        logger.info(f"Autocomplete request for term: {term}")
-        response = amadeus.reference_data.locations.get(
-            keyword=term,
-            subType="AIRPORT,CITY",
-        )
+        request_logger.info("Autocomplete request for term: %s", term)
+        locations = await search_locations(term, ("AIRPORT", "CITY"))
         data = [
             {
                 "iataCode": location["iataCode"],
                 "name": location["name"],
                 "cityName": location.get("address", {}).get("cityName", ""),
             }
-            for location in response.data
+            for location in locations
         ]
-        return JSONResponse(content=data)
-    except ResponseError as error:
+        return ORJSONResponse(content=data)
+    except AmadeusAPIError as error:
         logger.error(f"Autocomplete error: {error}")
-        return JSONResponse(content={"error": str(error)}, status_code=500)
+        raise amadeus_http_error(error, "Failed to fetch airports from Amadeus API")
@@ -0,0 +1,154 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    start_http_server,
+    CONTENT_TYPE_LATEST,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Set in the Celery containers so every prefork child writes its samples where the exporter can merge them
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 9100))
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CYCLE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# API
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "API request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+
+# Upstreams, from both the API and the workers
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Amadeus and SendGrid call latency",
+    ["service", "endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+
+# Notification cycle
+CYCLE_DURATION = Histogram(
+    "notification_cycle_duration_seconds", "Wall time of one check_and_send_notifications dispatch",
+    buckets=CYCLE_BUCKETS,
+)
+NOTIFICATIONS_DUE = Counter("notifications_due", "Due notifications claimed by the dispatcher")
+ALERTS_PROCESSED = Counter(
+    "alerts_processed", "Notifications processed by shard tasks, by outcome", ["outcome"],
+)
+DB_STAGE_DURATION = Histogram(
+    "db_stage_duration_seconds", "Database time per stage of the notification cycle",
+    ["stage"], buckets=LATENCY_BUCKETS,
+)
+
+
+def observe_upstream(service, endpoint, status, started):
+    UPSTREAM_REQUEST_DURATION.labels(service, endpoint, str(status)).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def db_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_STAGE_DURATION.labels(stage).observe(time.perf_counter() - started)
+
+
+class AppStatsCollector:
+    """
+    Exposes the in-process counters the caches, limiter, password hasher, DB pools and log queue already keep,
+    read at scrape time.
+    """
+
+    def collect(self):
+        from .amadeus_cache import amadeus_cache
+        from .database import pool_stats
+        from . import logging_setup
+        from .auth.dependencies import user_cache
+        from .auth.hashing import password_hasher
+        from .rate_limiter import amadeus_limiter
+        from .response_cache import response_cache
+
+        cache = CounterMetricFamily("amadeus_cache_lookups", "Amadeus response cache lookups", labels=["endpoint", "result"])
+        for endpoint, counters in amadeus_cache.cache_stats().items():
+            for result, value in counters.items():
+                cache.add_metric([endpoint, result], value)
+        yield cache
+
+        users = CounterMetricFamily("user_cache_lookups", "Token to user cache lookups", labels=["result"])
+        stats = user_cache.cache_stats()
+        users.add_metric(["hit"], stats["hits"])
+        users.add_metric(["miss"], stats["misses"])
+        yield users
+
+        responses = CounterMetricFamily("response_cache_lookups", "Encoded API response cache lookups", labels=["result"])
+        stats = response_cache.cache_stats()
+        responses.add_metric(["hit"], stats["hits"])
+        responses.add_metric(["miss"], stats["misses"])
+        yield responses
+
+        limiter = CounterMetricFamily("amadeus_rate_limiter", "Rate limiter decisions", labels=["priority", "decision"])
+        for priority, counters in amadeus_limiter.limiter_stats().items():
+            for decision in ("granted", "throttled", "rejected"):
+                limiter.add_metric([priority, decision], counters[decision])
+        yield limiter
+
+        connections = GaugeMetricFamily("db_pool_connections", "Pooled connections by engine and state", labels=["engine", "state"])
+        sizes = GaugeMetricFamily("db_pool_size", "Configured pool size by engine", labels=["engine"])
+        for role, counters in pool_stats().items():
+            for state in ("checked_out", "overflow", "idle"):
+                connections.add_metric([role, state], counters[state])
+            sizes.add_metric([role], counters["size"])
+        yield connections
+        yield sizes
+
+        hashing = password_hasher.hashing_stats()
+        yield GaugeMetricFamily("password_hash_queued", "Password hashes waiting for a worker thread", value=hashing["queued"])
+        yield GaugeMetricFamily("password_hash_running", "Password hashes in progress", value=hashing["running"])
+        yield CounterMetricFamily("password_hash_rejected", "Password hashes refused with a 503", value=hashing["rejected"])
+
+        if logging_setup.queue_handler is not None:
+            yield CounterMetricFamily(
+                "log_records_dropped", "Log records dropped because the log queue was full",
+                value=logging_setup.queue_handler.dropped,
+            )
+
+
+def metrics_response_body(registry=REGISTRY):
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def clear_multiproc_dir():
+    """
+    Deletes the sample files a previous run left in PROMETHEUS_MULTIPROC_DIR (the directory survives a container
+    restart), which the collector would otherwise add into the counters and histograms. Call in the worker's
+    main process before the pool forks.
+    """
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        if name.endswith(".db"):
+            os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
+
+def start_worker_metrics_server(port=WORKER_METRICS_PORT):
+    """
+    Serves the worker's metrics over HTTP. With PROMETHEUS_MULTIPROC_DIR set, samples from every prefork
+    child are merged; without it only this process's own samples are visible.
+    """
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+    logger.info(f"Worker metrics on :{port}")
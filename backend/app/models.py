@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Numeric, Date
+from sqlalchemy import Column, Integer, String, CHAR, Text, DateTime, ForeignKey, Boolean, Numeric, Date, Index, text
 from .database import Base
 from datetime import datetime
 from sqlalchemy.orm import relationship
@@ -10,6 +10,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    # Bumped whenever the user's notifications change; the list endpoint derives its ETag from it
+    notifications_version = Column(Integer, nullable=False, default=0, server_default="0")
     flight_notifications = relationship("FlightNotification", back_populates="user", cascade="all, delete-orphan")
     
 class FlightNotification(Base):
@@ -31,15 +33,86 @@ class FlightNotification(Base):
     is_active = Column(Boolean, default=True)
     last_notification = Column(DateTime, nullable=True)
 
+    # When the scheduler should process this notification next; new notifications are due right away
+    next_due_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
     # Define the relationship to the user (if needed)
     user = relationship("User", back_populates="flight_notifications")
 
+    __table_args__ = (
+        # Only active rows are ever scheduled, so keep inactive ones out of the index
+        Index(
+            "ix_flight_notifications_due",
+            "next_due_at",
+            "id",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active"),
+        ),
+        # Keyset pagination of a user's notifications
+        Index("ix_flight_notifications_user_id_id", "user_id", "id"),
+    )
+
     @validates('max_price')
     def validate_max_price(self, key, value):
         if value is not None and value < 0:
             raise ValueError("max_price should be a positive value.")
         return value
 
+class EmailOutbox(Base):
+    """
+    Alert emails waiting to be sent. Rows are written in the same transaction that marks their
+    notifications as processed, and a relay task sends and marks them.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    notification_id = Column(Integer, nullable=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+
+    # One email per notification per due slot, so a replayed batch can't enqueue it twice
+    dedupe_key = Column(String, nullable=False, unique=True)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_pending",
+            "id",
+            postgresql_where=text("sent_at IS NULL"),
+            sqlite_where=text("sent_at IS NULL"),
+        ),
+    )
+
+class PriceObservation(Base):
+    """
+    One summary of a flight offer search per route, departure date and time observed.
+    Partitioned by month of observed_at in PostgreSQL; the primary key doubles as the per-departure-date history index.
+    """
+    __tablename__ = "price_observations"
+
+    origin = Column(CHAR(3), primary_key=True)
+    destination = Column(CHAR(3), primary_key=True)
+    departure_date = Column(Date, primary_key=True)
+    observed_at = Column(DateTime, primary_key=True)
+    min_price = Column(Numeric(10, 2), nullable=False)
+    median_price = Column(Numeric(10, 2), nullable=False)
+    offer_count = Column(Integer, nullable=False)
+    currency = Column(CHAR(3), nullable=True)
+
+    # maxPrice the search ran with (None if unbounded); offers above it were never seen
+    search_max_price = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Route history without a departure date, newest first; the primary key only serves it per departure date
+        Index("ix_price_observations_route_observed_at", "origin", "destination", "observed_at", "departure_date"),
+        {"postgresql_partition_by": "RANGE (observed_at)"},
+    )
+
 class FlightDestinationDummy(Base):
     __tablename__ = 'flight_destinations_dummy'
     
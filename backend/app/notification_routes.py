@@ -1,16 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import update, insert, delete
 from sqlalchemy.orm import Session
-from .models import FlightNotification
-from .schemas import FlightNotificationCreate, FlightNotificationResponse
-from .database import get_db
+from .models import FlightNotification, User
+from .schemas import (
+    FlightNotificationCreate,
+    FlightNotificationResponse,
+    FlightNotificationBulkIds,
+    FlightNotificationBulkUpdate,
+    FlightNotificationBulkResult,
+    BULK_MAX_ITEMS,
+)
+from .database import engine, read_engine, SessionLocal, get_db, get_read_db
 from .auth.dependencies import get_current_user  # Assuming you have a dependency for user authentication
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Fields list_notifications can project to; id is always returned since it is the cursor
+LIST_FIELDS = tuple(FlightNotificationResponse.__fields__)
+
+# After a change, the user's list is read from the primary for this long, to outlast replica lag
+RECENT_WRITE_SECONDS = int(os.getenv("NOTIFICATIONS_RECENT_WRITE_SECONDS", 10))
+RECENT_WRITE_COOKIE = "notifications_written"
+
+
+def bump_notifications_version(db, user_id):
+    """
+    Invalidates the user's notification list ETag. Call in the same transaction as the change.
+    """
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(notifications_version=User.notifications_version + 1)
+    )
+
+
+def mark_recent_write(response):
+    """
+    Sets a short-lived cookie telling list_notifications to read this browser's list from the primary until
+    the replica has caught up with the change.
+    """
+    response.set_cookie(RECENT_WRITE_COOKIE, "1", max_age=RECENT_WRITE_SECONDS, httponly=True)
+
+
+def notifications_etag(db, user_id, limit, after, fields):
+    version = db.query(User.notifications_version).filter(User.id == user_id).scalar() or 0
+    return f'W/"{user_id}.{version}.{limit}.{after or 0}.{",".join(fields)}"'
+
+
+def parse_fields(fields):
+    if not fields:
+        return LIST_FIELDS
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(LIST_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(field for field in LIST_FIELDS if field in requested or field == "id")
+
 @router.post("/notify/notifications/", response_model=FlightNotificationResponse)
 def create_notification(
-    notification: FlightNotificationCreate, 
-    db: Session = Depends(get_db), 
+    notification: FlightNotificationCreate,
+    response: Response,
+    db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user)  # Get current user
 ):
     """
@@ -18,25 +75,125 @@ def create_notification(
     """
     db_notification = FlightNotification(**notification.dict(), user_id=current_user.id)
     db.add(db_notification)
+    bump_notifications_version(db, current_user.id)
     db.commit()
+    mark_recent_write(response)
     db.refresh(db_notification)
     return db_notification
 
 @router.get("/notify/notifications/", response_model=list[FlightNotificationResponse])
 def list_notifications(
-    db: Session = Depends(get_db), 
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, description="Return notifications after this id (the previous page's X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. origin,destination"),
+    db: Session = Depends(get_read_db),
     current_user: str = Depends(get_current_user)
 ):
     """
-    List all notifications for the current user.
+    List the current user's notifications, a page at a time in id order.
+    When there are more, the X-Next-Cursor header holds the value to pass as `after` for the next page.
+    Unchanged lists answer If-None-Match with 304 after a single lookup of the user's version.
+    Read from the replica, except for a few seconds after this browser changed the list (see mark_recent_write).
     """
-    notifications = db.query(FlightNotification).filter_by(user_id=current_user.id).all()
-    return notifications
+    columns = parse_fields(fields)
+    if read_engine is not engine and RECENT_WRITE_COOKIE in request.cookies:
+        with SessionLocal() as primary:
+            return notifications_page(primary, request, current_user.id, limit, after, columns)
+    return notifications_page(db, request, current_user.id, limit, after, columns)
+
+
+def notifications_page(db, request, user_id, limit, after, columns):
+    etag = notifications_etag(db, user_id, limit, after, columns)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    query = db.query(*(getattr(FlightNotification, column) for column in columns)).filter(
+        FlightNotification.user_id == user_id
+    )
+    if after is not None:
+        query = query.filter(FlightNotification.id > after)
+    rows = query.order_by(FlightNotification.id).limit(limit + 1).all()
+
+    headers = {"ETag": etag}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1].id)
+    return JSONResponse(content=jsonable_encoder([row._asdict() for row in rows]), headers=headers)
+
+@router.post("/notify/notifications/bulk/", response_model=list[FlightNotificationResponse])
+def create_notifications_bulk(
+    notifications: list[FlightNotificationCreate],
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Create many notifications for the current user with one multi-row INSERT ... RETURNING.
+    The whole batch is validated before anything is written, and either all rows are created or none.
+    """
+    if not 1 <= len(notifications) <= BULK_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"Send between 1 and {BULK_MAX_ITEMS} notifications")
+    created = db.execute(
+        insert(FlightNotification)
+        .values([{**notification.dict(), "user_id": current_user.id} for notification in notifications])
+        .returning(*(getattr(FlightNotification, field) for field in LIST_FIELDS))
+    ).all()
+    bump_notifications_version(db, current_user.id)
+    db.commit()
+    mark_recent_write(response)
+    return [row._asdict() for row in created]
+
+@router.patch("/notify/notifications/bulk/", response_model=FlightNotificationBulkResult)
+def update_notifications_bulk(
+    changes: FlightNotificationBulkUpdate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Pause (is_active=false) or resume many of the current user's notifications in one UPDATE ... RETURNING.
+    Returns the ids that were changed; ids that don't belong to the user are ignored.
+    """
+    updated = db.execute(
+        update(FlightNotification)
+        .where(FlightNotification.user_id == current_user.id, FlightNotification.id.in_(changes.ids))
+        .values(is_active=changes.is_active)
+        .returning(FlightNotification.id)
+    ).scalars().all()
+    if updated:
+        bump_notifications_version(db, current_user.id)
+        mark_recent_write(response)
+    db.commit()
+    return {"ids": sorted(updated)}
+
+@router.delete("/notify/notifications/bulk/", response_model=FlightNotificationBulkResult)
+def delete_notifications_bulk(
+    selection: FlightNotificationBulkIds,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Delete many of the current user's notifications in one DELETE ... RETURNING.
+    Returns the ids that were deleted; ids that don't belong to the user are ignored.
+    """
+    deleted = db.execute(
+        delete(FlightNotification)
+        .where(FlightNotification.user_id == current_user.id, FlightNotification.id.in_(selection.ids))
+        .returning(FlightNotification.id)
+    ).scalars().all()
+    if deleted:
+        bump_notifications_version(db, current_user.id)
+        mark_recent_write(response)
+    db.commit()
+    return {"ids": sorted(deleted)}
 
 @router.delete("/notify/notifications/{notification_id}/")
 def delete_notification(
-    notification_id: int, 
-    db: Session = Depends(get_db), 
+    notification_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
     current_user: str = Depends(get_current_user)
 ):
     """
@@ -46,5 +203,7 @@ def delete_notification(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     db.delete(notification)
+    bump_notifications_version(db, current_user.id)
     db.commit()
+    mark_recent_write(response)
     return {"message": "Notification deleted successfully"}
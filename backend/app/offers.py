@@ -0,0 +1,127 @@
+import re
+import heapq
+import logging
+from decimal import Decimal, InvalidOperation
+from operator import attrgetter
+
+logger = logging.getLogger(__name__)
+
+# ISO 8601 durations as Amadeus sends them: PT2H30M, PT45M, P1DT2H
+DURATION_RE = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$")
+
+NO_LINK = "No link available"
+
+
+def parse_duration_minutes(duration_iso):
+    """
+    Converts an ISO 8601 duration to whole minutes, or None if it can't be parsed.
+    """
+    match = DURATION_RE.match(duration_iso or "")
+    if not match or duration_iso == "P":
+        return None
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
+
+def format_minutes(minutes):
+    if minutes is None:
+        return "Unknown duration"
+    return f"{minutes // 60}h {minutes % 60}m"
+
+
+def format_duration(duration_iso):
+    return format_minutes(parse_duration_minutes(duration_iso))
+
+
+def format_cents(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+class Offer:
+    """
+    The parts of an Amadeus flight offer the alerts use, parsed once per search.
+    Prices are integer cents and durations whole minutes so ranking never re-reads the raw dicts.
+    """
+
+    __slots__ = (
+        "price_cents",
+        "currency",
+        "duration_minutes",
+        "origin",
+        "destination",
+        "departure_at",
+        "booking_link",
+    )
+
+    def __init__(self, price_cents, currency, duration_minutes, origin, destination, departure_at, booking_link=NO_LINK):
+        self.price_cents = price_cents
+        self.currency = currency
+        self.duration_minutes = duration_minutes
+        self.origin = origin
+        self.destination = destination
+        self.departure_at = departure_at
+        self.booking_link = booking_link
+
+    @classmethod
+    def from_amadeus(cls, flight):
+        itinerary = flight["itineraries"][0]
+        segments = itinerary["segments"]
+        duration = parse_duration_minutes(itinerary.get("duration"))
+        if duration is None:
+            # Flying time only; used when the itinerary total is missing
+            segment_durations = [parse_duration_minutes(s.get("duration")) for s in segments]
+            duration = None if None in segment_durations else sum(segment_durations)
+        return cls(
+            price_cents=int(Decimal(flight["price"]["total"]) * 100),
+            currency=flight["price"]["currency"],
+            duration_minutes=duration,
+            origin=segments[0]["departure"]["iataCode"],
+            destination=segments[-1]["arrival"]["iataCode"],
+            departure_at=segments[0]["departure"]["at"],
+            booking_link=flight.get("meta", {}).get("links", {}).get("self", NO_LINK),
+        )
+
+    def __repr__(self):
+        return f"<Offer({self.origin}-{self.destination} {self.departure_at}, {format_cents(self.price_cents)} {self.currency})>"
+
+
+def parse_offers(flights):
+    """
+    Parses raw Amadeus offers, skipping (and logging) any that are malformed.
+    """
+    offers = []
+    for flight in flights:
+        try:
+            offers.append(Offer.from_amadeus(flight))
+        except (KeyError, IndexError, TypeError, InvalidOperation) as e:
+            logger.warning(f"Skipping malformed flight offer {flight.get('id')}: {e!r}")
+    return offers
+
+
+def filter_offers_by_price(offers, max_price):
+    """
+    Keeps the offers whose total price is within max_price.
+    """
+    if max_price is None:
+        return list(offers)
+    limit_cents = int(Decimal(str(max_price)) * 100)
+    return [offer for offer in offers if offer.price_cents <= limit_cents]
+
+
+def cheapest(offers, k=5):
+    """
+    The k cheapest offers in O(n log k).
+    """
+    return heapq.nsmallest(k, offers, key=attrgetter("price_cents"))
+
+
+def _duration_key(offer):
+    # Unknown durations rank last; ties go to the cheaper offer
+    return (offer.duration_minutes is None, offer.duration_minutes or 0, offer.price_cents)
+
+
+def shortest(offers, k=5):
+    """
+    The k shortest offers in O(n log k).
+    """
+    return heapq.nsmallest(k, offers, key=_duration_key)
@@ -0,0 +1,102 @@
+import logging
+import statistics
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select, text
+from .models import PriceObservation
+from .database import insert_ignoring_conflicts
+
+logger = logging.getLogger(__name__)
+
+# History queries without a lower bound only look this far back, so PostgreSQL can prune partitions
+DEFAULT_HISTORY_DAYS = 30
+MAX_HISTORY_ROWS = 1000
+
+
+def summarize_offers(origin, destination, departure_date, offers, observed_at, search_max_price=None):
+    """
+    Reduces one flight offer search (parsed Offers) to a price observation row, or None if nothing can be recorded.
+    """
+    if not offers:
+        return None
+    try:
+        departure = date.fromisoformat(departure_date)
+    except ValueError:
+        logger.warning(f"Not recording prices for unparseable departure date {departure_date}")
+        return None
+    prices = [Decimal(offer.price_cents).scaleb(-2) for offer in offers]
+    return {
+        "origin": origin,
+        "destination": destination,
+        "departure_date": departure,
+        "observed_at": observed_at,
+        "min_price": min(prices),
+        "median_price": statistics.median(prices).quantize(Decimal("0.01")),
+        "offer_count": len(prices),
+        "currency": offers[0].currency,
+        "search_max_price": search_max_price,
+    }
+
+
+def record_observations(db, rows):
+    """
+    Bulk-inserts observation rows in one statement and commits. A route already observed at the same
+    instant (by another shard) is kept as is.
+    """
+    if rows:
+        key = ["origin", "destination", "departure_date", "observed_at"]
+        db.execute(insert_ignoring_conflicts(db, PriceObservation, key), rows)
+        db.commit()
+
+
+def partition_name(month_start):
+    return f"price_observations_y{month_start.year}m{month_start.month:02d}"
+
+
+def month_starts(start, months):
+    """
+    Yields the first day of the month containing start and of the following months.
+    """
+    current = date(start.year, start.month, 1)
+    for _ in range(months):
+        yield current
+        current = (current + timedelta(days=32)).replace(day=1)
+
+
+def ensure_partitions(db, today, months_ahead=2):
+    """
+    Creates the monthly partitions of price_observations from today's month up to months_ahead later.
+    Does nothing on databases without declarative partitioning.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for month_start in month_starts(today, months_ahead + 1):
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month_start)} PARTITION OF price_observations "
+            f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month.isoformat()}')"
+        ))
+    db.commit()
+
+
+def get_route_history(db, origin, destination, departure_date=None, since=None, until=None, limit=MAX_HISTORY_ROWS):
+    """
+    Returns the newest `limit` observations for a route, newest first; pass an earlier `until` for older ones.
+    The observed_at bounds are always applied so only the partitions covering the window are scanned. With a
+    departure date the primary key serves the query, without one the (origin, destination, observed_at)
+    index, and either is read backwards and stopped after `limit` rows.
+    """
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(days=DEFAULT_HISTORY_DAYS)
+    query = select(PriceObservation).where(
+        PriceObservation.origin == origin,
+        PriceObservation.destination == destination,
+        PriceObservation.observed_at >= since,
+        PriceObservation.observed_at <= until,
+    )
+    if departure_date is not None:
+        query = query.where(PriceObservation.departure_date == departure_date)
+    query = query.order_by(
+        PriceObservation.observed_at.desc(), PriceObservation.departure_date.desc()
+    ).limit(min(limit, MAX_HISTORY_ROWS))
+    return db.execute(query).scalars().all()
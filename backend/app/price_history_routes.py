@@ -0,0 +1,26 @@
+from datetime import date, datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from .database import get_read_db
+from .schemas import PriceObservationResponse
+from .price_history import get_route_history, MAX_HISTORY_ROWS
+from .auth.dependencies import get_current_user
+
+router = APIRouter()
+
+@router.get("/price_history", response_model=list[PriceObservationResponse])
+def price_history(
+    origin: str = Query(..., min_length=3, max_length=3),
+    destination: str = Query(..., min_length=3, max_length=3),
+    departure_date: Optional[date] = None,
+    since: Optional[datetime] = Query(None, description="Defaults to 30 days before `until`"),
+    until: Optional[datetime] = Query(None, description="Defaults to now"),
+    limit: int = Query(MAX_HISTORY_ROWS, ge=1, le=MAX_HISTORY_ROWS),
+    db: Session = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Price observations recorded by the notification worker for a route, newest first.
+    """
+    return get_route_history(db, origin.upper(), destination.upper(), departure_date, since, until, limit)
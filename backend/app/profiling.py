@@ -0,0 +1,210 @@
+"""
+Opt-in sampling profiler for API requests and Celery tasks.
+
+A background thread reads the target threads' stacks with sys._current_frames() every PROFILE_INTERVAL_MS
+and counts them. Each profile is written in collapsed-stack format (one "frame;frame;frame count" line per
+distinct stack), which flamegraph.pl, inferno and speedscope read directly:
+
+    flamegraph.pl app/profiles/20250501T120000-request-GET_api_price_history-1a2b3c.collapsed > out.svg
+
+Everything is off by default. Requests are profiled when PROFILE_REQUEST_SAMPLE_RATE picks them or when they
+carry the PROFILE_HEADER with the PROFILE_TOKEN value; tasks named in PROFILE_TASKS are profiled at
+PROFILE_TASK_SAMPLE_RATE. Only the newest PROFILE_KEEP files are kept.
+"""
+import os
+import re
+import sys
+import hmac
+import time
+import random
+import logging
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "app/profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 200))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+
+# Share of API requests profiled, 0 to 1
+PROFILE_REQUEST_SAMPLE_RATE = float(os.getenv("PROFILE_REQUEST_SAMPLE_RATE", 0))
+# Any request carrying this header with the token value is profiled; unset token disables the header
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+PROFILE_TASKS = [name for name in os.getenv(
+    "PROFILE_TASKS", "app.celery_worker.check_and_send_notifications"
+).split(",") if name]
+PROFILE_TASK_SAMPLE_RATE = float(os.getenv("PROFILE_TASK_SAMPLE_RATE", 0))
+
+# Leaf frames of threads parked waiting for work; left out so idle pool threads don't swamp the profile
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+def format_frame(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def collapse_stack(frame):
+    """
+    Returns the stack ending at frame as a root-first tuple of "function (file:line)" strings.
+    """
+    stack = []
+    while frame is not None:
+        stack.append(format_frame(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_LEAVES
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of thread_ids (every other thread when None) until stop() is called.
+    """
+
+    def __init__(self, thread_ids=None, interval=PROFILE_INTERVAL_MS / 1000):
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(own_id)
+
+    def sample(self, own_id=None):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            if is_idle(frame):
+                continue
+            self.stacks[(names.get(thread_id, str(thread_id)),) + collapse_stack(frame)] += 1
+
+    def collapsed(self):
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def safe_name(value):
+    return re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_")[:80]
+
+
+def write_profile(profiler, kind, name, directory=None, keep=None):
+    """
+    Writes the profile as <timestamp>-<kind>-<name>-<id>.collapsed and prunes the oldest files
+    beyond `keep`. Returns the path written.
+    """
+    directory = directory or PROFILE_DIR
+    keep = PROFILE_KEEP if keep is None else keep
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{kind}-{safe_name(name)}-{uuid.uuid4().hex[:6]}.collapsed"
+    path = os.path.join(directory, filename)
+    with open(path, "w") as f:
+        f.write(profiler.collapsed())
+    logger.info(f"Profiled {kind} {name}: {profiler.samples} samples over {profiler.elapsed * 1000:.0f}ms -> {path}")
+    prune_profiles(directory, keep)
+    return path
+
+
+def prune_profiles(directory, keep):
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".collapsed")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:max(len(profiles) - keep, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def request_profiling_enabled():
+    return PROFILE_REQUEST_SAMPLE_RATE > 0 or bool(PROFILE_TOKEN)
+
+
+def should_profile_request(request):
+    token = request.headers.get(PROFILE_HEADER)
+    if token and PROFILE_TOKEN and hmac.compare_digest(token, PROFILE_TOKEN):
+        return True
+    return PROFILE_REQUEST_SAMPLE_RATE > 0 and random.random() < PROFILE_REQUEST_SAMPLE_RATE
+
+
+async def profile_requests(request, call_next):
+    """
+    HTTP middleware. Sync endpoints run in the threadpool, so every busy thread is sampled; under
+    concurrent load a profile also shows the other requests in flight.
+    """
+    if not should_profile_request(request):
+        return await call_next(request)
+    profiler = SamplingProfiler().start()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+    try:
+        # Formatting, writing and pruning touch the disk, so keep them off the event loop
+        path = await run_in_threadpool(write_profile, profiler, "request", f"{request.method} {request.url.path}")
+        response.headers["X-Profile-File"] = os.path.basename(path)
+    except OSError as e:
+        logger.error(f"Could not write request profile: {e}")
+    return response
+
+
+# Profilers of the tasks running in this process, by task id
+running_task_profiles = {}
+
+
+def start_task_profile(task_id=None, task=None, **kwargs):
+    if task.name in PROFILE_TASKS and random.random() < PROFILE_TASK_SAMPLE_RATE:
+        # Prefork runs the task on the signalling thread, so only that thread is sampled
+        running_task_profiles[task_id] = SamplingProfiler({threading.get_ident()}).start()
+
+
+def finish_task_profile(task_id=None, task=None, **kwargs):
+    profiler = running_task_profiles.pop(task_id, None)
+    if profiler:
+        write_profile(profiler.stop(), "task", task.name)
+
+
+def connect_task_profiling():
+    """
+    Hooks the Celery task signals when task profiling is turned on; otherwise does nothing.
+    """
+    if PROFILE_TASK_SAMPLE_RATE <= 0 or not PROFILE_TASKS:
+        return False
+    from celery.signals import task_prerun, task_postrun
+
+    task_prerun.connect(start_task_profile, weak=False)
+    task_postrun.connect(finish_task_profile, weak=False)
+    return True
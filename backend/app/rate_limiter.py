@@ -0,0 +1,143 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import redis
+from .redis_client import get_redis, mark_redis_down
+
+logger = logging.getLogger(__name__)
+
+# Amadeus quota shared by the API and every worker (the self-service test environment allows 10 TPS)
+AMADEUS_RATE_PER_SECOND = float(os.getenv("AMADEUS_RATE_PER_SECOND", 10))
+AMADEUS_BURST = float(os.getenv("AMADEUS_BURST", 10))
+
+# Share of the bucket only interactive calls may use: background calls wait once the bucket drops below it
+AMADEUS_INTERACTIVE_RESERVE = float(os.getenv("AMADEUS_INTERACTIVE_RESERVE", 0.3))
+
+# Longest a call waits for a token before giving up
+INTERACTIVE_MAX_WAIT = float(os.getenv("AMADEUS_INTERACTIVE_MAX_WAIT", 2))
+BACKGROUND_MAX_WAIT = float(os.getenv("AMADEUS_BACKGROUND_MAX_WAIT", 120))
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+BUCKET_KEY = "ratelimit:amadeus"
+
+# Refills the bucket for the time elapsed, then takes one token if at least `floor` tokens would remain.
+# Returns 0 when granted, otherwise the milliseconds until enough tokens are back.
+# Uses the Redis clock so every process agrees on elapsed time.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local floor = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait_ms = 0
+if tokens - 1 >= floor then
+    tokens = tokens - 1
+else
+    wait_ms = math.ceil((floor + 1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return wait_ms
+"""
+
+
+class RateLimited(Exception):
+    """
+    Raised when no token became available within the caller's max wait.
+    """
+
+    def __init__(self, priority, waited):
+        super().__init__(f"No Amadeus {priority} token after {waited:.1f}s")
+        self.priority = priority
+        self.waited = waited
+
+
+class RateLimiter:
+    """
+    Token bucket kept in Redis so the API and all workers draw from one Amadeus quota.
+
+    Interactive calls may drain the bucket; background calls stop at the reserved share and wait for the
+    refill, so a notification sweep slows down instead of taking the tokens users' searches need.
+    When Redis is unavailable calls go through unthrottled rather than failing.
+    """
+
+    def __init__(self, redis_getter=get_redis, rate=AMADEUS_RATE_PER_SECOND, capacity=AMADEUS_BURST,
+                 interactive_reserve=AMADEUS_INTERACTIVE_RESERVE, key=BUCKET_KEY):
+        self.redis_getter = redis_getter
+        self.rate = rate
+        self.capacity = capacity
+        self.key = key
+        self.floors = {INTERACTIVE: 0, BACKGROUND: capacity * interactive_reserve}
+        self.max_waits = {INTERACTIVE: INTERACTIVE_MAX_WAIT, BACKGROUND: BACKGROUND_MAX_WAIT}
+        self.stats = {priority: {"granted": 0, "throttled": 0, "rejected": 0, "waited_s": 0.0} for priority in self.floors}
+        self._script = None
+
+    def acquire(self, priority=BACKGROUND, max_wait=None):
+        """
+        Blocks until a token is granted, sleeping for the time the bucket says it needs to refill.
+        """
+        deadline = time.monotonic() + (self.max_waits[priority] if max_wait is None else max_wait)
+        started = time.monotonic()
+        while True:
+            wait = self._take(priority)
+            if not wait:
+                return self._granted(priority, started)
+            self._throttled(priority, started, deadline, wait)
+            time.sleep(self._jitter(wait))
+
+    async def acquire_async(self, priority=INTERACTIVE, max_wait=None):
+        """
+        Async variant of acquire for the API; the Redis call runs in a worker thread like the response cache's.
+        """
+        deadline = time.monotonic() + (self.max_waits[priority] if max_wait is None else max_wait)
+        started = time.monotonic()
+        while True:
+            wait = await asyncio.to_thread(self._take, priority)
+            if not wait:
+                return self._granted(priority, started)
+            self._throttled(priority, started, deadline, wait)
+            await asyncio.sleep(self._jitter(wait))
+
+    def limiter_stats(self):
+        return {priority: dict(counters) for priority, counters in self.stats.items()}
+
+    def _take(self, priority):
+        """
+        Returns 0 if a token was taken, otherwise the seconds to wait before asking again.
+        """
+        client = self.redis_getter()
+        if client is None:
+            return 0
+        try:
+            if self._script is None:
+                self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+            wait_ms = self._script(keys=[self.key], args=[self.rate, self.capacity, self.floors[priority]])
+        except redis.RedisError as e:
+            mark_redis_down(e)
+            return 0
+        return int(wait_ms) / 1000
+
+    def _granted(self, priority, started):
+        self.stats[priority]["granted"] += 1
+        self.stats[priority]["waited_s"] += time.monotonic() - started
+
+    def _throttled(self, priority, started, deadline, wait):
+        self.stats[priority]["throttled"] += 1
+        if time.monotonic() + wait > deadline:
+            self.stats[priority]["rejected"] += 1
+            raise RateLimited(priority, time.monotonic() - started)
+
+    def _jitter(self, wait):
+        # Spread retries so waiting workers don't all wake up for the same refilled token
+        return wait * random.uniform(1, 1.5)
+
+
+amadeus_limiter = RateLimiter()
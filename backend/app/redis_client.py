@@ -0,0 +1,36 @@
+import os
+import time
+import logging
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Same Redis instance Celery uses as broker/backend
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# How long to stop trying Redis after a connection failure
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", 30))
+
+_client = None
+_down_until = 0.0
+
+
+def get_redis():
+    """
+    Returns the shared Redis client, or None while Redis is marked as unavailable.
+    """
+    global _client
+    if time.monotonic() < _down_until:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _client
+
+
+def mark_redis_down(error):
+    """
+    Stops callers from using Redis for REDIS_RETRY_SECONDS so an outage doesn't add a timeout to every call.
+    """
+    global _down_until
+    _down_until = time.monotonic() + REDIS_RETRY_SECONDS
+    logger.warning(f"Redis unavailable, retrying in {REDIS_RETRY_SECONDS}s: {error}")
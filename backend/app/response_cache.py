@@ -0,0 +1,125 @@
+"""
+In-process cache of finished API responses: the serialized JSON body together with its gzip and brotli
+encodings and an ETag, keyed on the normalized request.
+
+A repeat search is answered without touching Amadeus, the JSON encoder or the compressor, and a browser
+revalidating with If-None-Match gets an empty 304.
+"""
+import os
+import gzip
+import hashlib
+import threading
+import brotli
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+from .amadeus_cache import TTLCache, MISSING, make_cache_key
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 60))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 256))
+# Bodies smaller than this gain nothing from compression
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", 1024))
+# Bodies at least this big are compressed in the threadpool rather than on the event loop
+COMPRESS_THREADPOOL_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_THREADPOOL_MIN_BYTES", 16384))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", 5))
+
+
+class CachedResponse:
+    __slots__ = ("etag", "encodings")
+
+    def __init__(self, body):
+        # Weak: the identity, gzip and br representations share it, and strong validators must differ per coding
+        self.etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        self.encodings = {"identity": body}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            self.encodings["gzip"] = gzip.compress(body, GZIP_LEVEL)
+            self.encodings["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def negotiate_encoding(accept_encoding, available):
+    """
+    Picks the smallest encoding in `available` that the Accept-Encoding header allows, falling back to identity.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Weak comparison, as If-None-Match uses: tags match when their opaque parts do, W/ or not.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return opaque in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = TTLCache(max_entries)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        with self._lock:
+            self.stats["misses" if entry is MISSING else "hits"] += 1
+        return entry
+
+    def put(self, key, body):
+        entry = CachedResponse(body)
+        self._entries.set(key, entry, self.ttl)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def cache_stats(self):
+        with self._lock:
+            return dict(self.stats, size=len(self._entries))
+
+    async def respond_body(self, request, endpoint, params, produce_body):
+        """
+        Serves the response for params from the cache, awaiting produce_body() for the encoded JSON body on a miss.
+        """
+        key = make_cache_key(endpoint, params)
+        entry = self.get(key)
+        if entry is MISSING:
+            body = await produce_body()
+            if len(body) >= COMPRESS_THREADPOOL_MIN_BYTES:
+                entry = await run_in_threadpool(self.put, key, body)
+            else:
+                entry = self.put(key, body)
+        return self.render(request, entry)
+
+    def render(self, request, entry):
+        headers = {
+            "ETag": entry.etag,
+            # Searches are per-user (cookie auth), so only the browser may keep them
+            "Cache-Control": f"private, max-age={self.ttl}",
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), entry.encodings)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=entry.encodings[encoding], media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache()
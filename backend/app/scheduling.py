@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+
+def get_timedelta(frequency, unit):
+    """
+    Converts frequency and unit to a timedelta object.
+    """
+    unit_mapping = {
+        "minutes": timedelta(minutes=frequency),
+        "hours": timedelta(hours=frequency),
+        "days": timedelta(days=frequency),
+        "weeks": timedelta(weeks=frequency),
+    }
+    if unit not in unit_mapping:
+        raise ValueError(f"Invalid frequency unit: {unit}")
+    return unit_mapping[unit]
+
+
+def compute_next_due_at(notification, sent_at):
+    """
+    Returns when a notification is next due after being processed at sent_at.
+    """
+    return sent_at + get_timedelta(notification.frequency, notification.frequency_unit)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr, validator,Field
 import re
 from typing import Optional 
-from datetime import datetime
+from datetime import datetime, date
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -44,6 +44,24 @@ class FlightNotificationCreate(BaseModel):
     frequency: int
     frequency_unit: str
 
+    @validator("max_price")
+    def validate_max_price(cls, value):
+        if value < 0:
+            raise ValueError("max_price should be a positive value.")
+        return value
+
+# Most notifications one bulk request may create, update or delete
+BULK_MAX_ITEMS = 500
+
+class FlightNotificationBulkIds(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class FlightNotificationBulkUpdate(FlightNotificationBulkIds):
+    is_active: bool
+
+class FlightNotificationBulkResult(BaseModel):
+    ids: list[int]
+
 class FlightNotificationResponse(BaseModel):
     origin: str
     destination: str
@@ -83,4 +101,22 @@ class LocationSearchRequest(BaseModel):
             "example": {
                 "keyword": "LON"
             }
-        }
\ No newline at end of file
+        }
+
+class PriceObservationResponse(BaseModel):
+    origin: str
+    destination: str
+    departure_date: date
+    observed_at: datetime
+    min_price: float
+    median_price: float
+    offer_count: int
+    currency: Optional[str]
+    search_max_price: Optional[int]
+
+class CurrentUser(BaseModel):
+    id: int
+    email: str
+
+    class Config:
+        frozen = True
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one: the first caller runs fetch() and the others
+    block until it finishes and get the same result (or exception). Nothing is kept once the call is done.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = defaultdict(lambda: {"calls": 0, "coalesced": 0})
+
+    def do(self, key, fetch, label="default"):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self.stats[label]["calls" if leader else "coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def flight_stats(self):
+        with self._lock:
+            return {label: dict(counters) for label, counters in self.stats.items()}
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines. The upstream call runs as its own task, so a caller that disconnects
+    (and is cancelled) doesn't cancel it for the others waiting on it.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.stats = defaultdict(lambda: {"calls": 0, "coalesced": 0})
+
+    async def do(self, key, fetch, label="default"):
+        task = self._tasks.get(key)
+        if task is None:
+            self.stats[label]["calls"] += 1
+            task = self._tasks[key] = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda finished: self._finish(key, finished))
+        else:
+            self.stats[label]["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved in case every waiter was cancelled before seeing it
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Coalesced call {key} failed: {task.exception()!r}")
+
+    def flight_stats(self):
+        return {label: dict(counters) for label, counters in self.stats.items()}
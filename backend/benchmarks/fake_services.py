@@ -0,0 +1,143 @@
+"""
+Local stand-ins for Amadeus and SendGrid with injectable latency and error rates, used by the benchmarks.
+Each runs a ThreadingHTTPServer on a free localhost port and counts the requests it serves.
+"""
+import json
+import time
+import random
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeService:
+    """
+    Base for the fake upstreams: every request sleeps `latency` seconds (plus up to `jitter`), and fails
+    with `error_status` with probability `error_rate`.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                service._serve(self)
+
+            def do_POST(self):
+                service._serve(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _serve(self, request):
+        url = urlparse(request.path)
+        body = request.rfile.read(int(request.headers.get("Content-Length") or 0))
+        with self._lock:
+            self.calls[url.path] += 1
+            failed = self.random.random() < self.error_rate
+            delay = self.latency + self.random.uniform(0, self.jitter)
+        time.sleep(delay)
+        if failed:
+            status, payload = self.error_status, {"errors": [{"status": self.error_status, "title": "INJECTED ERROR"}]}
+        else:
+            status, payload = self.handle(url.path, parse_qs(url.query), body)
+        raw = b"" if payload is None else json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(raw)))
+        request.end_headers()
+        request.wfile.write(raw)
+
+    def handle(self, path, query, body):
+        raise NotImplementedError
+
+
+class FakeAmadeus(FakeService):
+    """
+    Serves the OAuth token endpoint and flight offer searches with `offers_per_search` offers per route.
+    """
+
+    def __init__(self, offers_per_search=50, **kwargs):
+        super().__init__(**kwargs)
+        self.offers_per_search = offers_per_search
+
+    def handle(self, path, query, body):
+        if path == "/v1/security/oauth2/token":
+            return 200, {"access_token": "benchmark-token", "expires_in": 1799, "token_type": "Bearer"}
+        if path == "/v2/shopping/flight-offers":
+            return 200, {"data": self.flight_offers(query)}
+        return 404, {"errors": [{"status": 404, "title": "NOT FOUND"}]}
+
+    def flight_offers(self, query):
+        origin = query["originLocationCode"][0]
+        destination = query["destinationLocationCode"][0]
+        departure_date = query["departureDate"][0]
+        max_price = int(query["maxPrice"][0]) if "maxPrice" in query else None
+        offers = []
+        for i in range(self.offers_per_search):
+            price = 40 + (i * 37) % 400
+            if max_price is not None and price > max_price:
+                continue
+            minutes = 60 + (i * 53) % 600
+            offers.append({
+                "type": "flight-offer",
+                "id": str(i + 1),
+                "price": {"currency": "EUR", "total": f"{price}.{i % 100:02d}"},
+                "itineraries": [{
+                    "duration": f"PT{minutes // 60}H{minutes % 60}M",
+                    "segments": [{
+                        "departure": {"iataCode": origin, "at": f"{departure_date}T{6 + i % 16:02d}:00:00"},
+                        "arrival": {"iataCode": destination},
+                        "duration": f"PT{minutes // 60}H{minutes % 60}M",
+                    }],
+                }],
+            })
+        return offers
+
+
+class FakeSendGrid(FakeService):
+    """
+    Accepts /v3/mail/send and records when each email (personalization) was accepted.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.accepted_at = []
+
+    def handle(self, path, query, body):
+        if path != "/v3/mail/send":
+            return 404, None
+        accepted_at = time.perf_counter()
+        payload = json.loads(body)
+        with self._lock:
+            self.accepted_at.extend(accepted_at for _ in payload["personalizations"])
+        return 202, None
@@ -0,0 +1,76 @@
+"""
+Login throughput and latency at different bcrypt costs, for sizing PASSWORD_HASH_WORKERS and BCRYPT_ROUNDS.
+
+Simulates `concurrency` clients logging in back to back through the same PasswordHasher the /auth routes use,
+and reports throughput, p50/p99 latency and how many attempts were turned away with a 503.
+
+    cd backend && python -m benchmarks.login_benchmark --rounds 10 11 12 --concurrency 32 --requests 200
+"""
+import argparse
+import os
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from app.auth.hashing import PasswordHasher, HashingBusy
+
+PASSWORD = "74£MXy@TM;(TuHJ6La"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(rounds, workers, max_pending, concurrency, requests):
+    hasher = PasswordHasher(rounds=rounds, workers=workers, max_pending=max_pending)
+    hashed = hasher.context.hash(PASSWORD)
+    latencies = []
+    rejected = 0
+
+    def login(_):
+        started = time.perf_counter()
+        try:
+            assert hasher.verify(PASSWORD, hashed)
+        except HashingBusy:
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        for latency in clients.map(login, range(requests)):
+            if latency is None:
+                rejected += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    return {
+        "rounds": rounds,
+        "logins_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": percentile(latencies, 99) if latencies else 0.0,
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--max-pending", type=int, default=None, help="defaults to --concurrency, so no attempt is shed")
+    parser.add_argument("--concurrency", type=int, default=32, help="simultaneous clients")
+    parser.add_argument("--requests", type=int, default=200, help="logins per cost setting")
+    args = parser.parse_args()
+    max_pending = args.max_pending or args.concurrency
+
+    print(f"workers={args.workers} max_pending={max_pending} concurrency={args.concurrency} requests={args.requests}")
+    print(f"{'rounds':>6} {'logins/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'rejected':>9}")
+    for rounds in args.rounds:
+        result = run(rounds, args.workers, max_pending, args.concurrency, args.requests)
+        print(f"{result['rounds']:>6} {result['logins_per_s']:>10.1f} {result['p50_ms']:>9.1f} "
+              f"{result['p99_ms']:>9.1f} {result['rejected']:>9}")
+
+
+if __name__ == "__main__":
+    main()
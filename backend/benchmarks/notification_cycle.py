@@ -0,0 +1,169 @@
+"""
+End-to-end benchmark of one notification cycle.
+
+Seeds users and FlightNotification rows (with Zipf-skewed route popularity), points the worker at local fake
+Amadeus and SendGrid servers, runs check_and_send_notifications with Celery in eager mode (shards and the
+outbox relay run in-process, exactly the code the workers run) and reports:
+
+- alerts per second (emails accepted by SendGrid over the cycle's wall time)
+- upstream calls to each fake service
+- database round trips
+- p50/p99 per-alert latency, from cycle start to SendGrid accepting the email
+
+    cd backend && python -m benchmarks.notification_cycle --users 500 --notifications 5000 --routes 200 --skew 1.1
+
+Uses a throwaway SQLite file unless --database-url is given. Tables there are dropped and recreated.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from benchmarks.fake_services import FakeAmadeus, FakeSendGrid
+
+AIRPORTS = [
+    "MAD", "BCN", "LPA", "PMI", "AGP", "LHR", "LGW", "CDG", "ORY", "AMS", "FRA", "MUC", "FCO", "MXP", "LIS",
+    "OPO", "DUB", "BRU", "ZRH", "VIE", "CPH", "ARN", "OSL", "HEL", "ATH", "IST", "JFK", "EWR", "MIA", "BOS",
+]
+
+
+def zipf_weights(count, skew):
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def make_routes(count, rng):
+    routes = set()
+    start = datetime.utcnow().date() + timedelta(days=7)
+    while len(routes) < count:
+        origin, destination = rng.sample(AIRPORTS, 2)
+        routes.add((origin, destination, (start + timedelta(days=rng.randrange(60))).isoformat()))
+    return sorted(routes)
+
+
+def seed(db, users, notifications, routes, skew, rng):
+    """
+    Inserts the users and due notifications in bulk; route i is picked with weight 1 / i**skew.
+    """
+    from app.models import User, FlightNotification
+
+    db.execute(User.__table__.insert(), [
+        {"id": i, "email": f"user{i}@benchmark.test", "hashed_password": "x"} for i in range(1, users + 1)
+    ])
+    due_at = datetime.utcnow() - timedelta(minutes=1)
+    picked = rng.choices(make_routes(routes, rng), weights=zipf_weights(routes, skew), k=notifications)
+    db.execute(FlightNotification.__table__.insert(), [
+        {
+            "user_id": rng.randint(1, users),
+            "origin": origin,
+            "destination": destination,
+            "departure_date": departure_date,
+            "max_price": rng.choice([None, 100, 200, 300]),
+            "frequency": 1,
+            "frequency_unit": "hours",
+            "is_active": True,
+            "next_due_at": due_at,
+        }
+        for origin, destination, departure_date in picked
+    ])
+    db.commit()
+    return len(set(picked))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def run(args):
+    amadeus = FakeAmadeus(offers_per_search=args.offers, latency=args.amadeus_latency,
+                          error_rate=args.amadeus_error_rate, seed=args.seed).start()
+    sendgrid = FakeSendGrid(latency=args.sendgrid_latency, error_rate=args.sendgrid_error_rate, seed=args.seed).start()
+
+    # Configuration is read at import time, so it has to be in place before the app modules load
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["SENDGRID_API_HOST"] = sendgrid.url
+    os.environ.setdefault("HOST_MAIL", "alerts@benchmark.test")
+
+    from amadeus import Client
+    from sqlalchemy import event, func
+    from app import celery_worker
+    from app.database import Base, SessionLocal, engine
+    from app.models import EmailOutbox
+    from app.amadeus_cache import amadeus_cache
+    from app.rate_limiter import amadeus_limiter
+    from app.price_history import ensure_partitions
+
+    celery_worker.celery.conf.task_always_eager = True
+    celery_worker.amadeus = Client(client_id="benchmark", client_secret="benchmark",
+                                   host="127.0.0.1", port=amadeus.port, ssl=False)
+    # No Redis: every search reaches the fake Amadeus and the rate limiter lets it through
+    amadeus_cache.redis_getter = lambda: None
+    amadeus_cache.l1.clear()
+    amadeus_limiter.redis_getter = lambda: None
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if engine.dialect.name == "postgresql":
+        ensure_partitions(db, datetime.utcnow().date())
+    distinct_routes = seed(db, args.users, args.notifications, args.routes, args.skew, random.Random(args.seed))
+
+    round_trips = 0
+
+    def count_round_trip(*_):
+        nonlocal round_trips
+        round_trips += 1
+
+    event.listen(engine, "before_cursor_execute", count_round_trip)
+    started = time.perf_counter()
+    celery_worker.check_and_send_notifications.apply()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "before_cursor_execute", count_round_trip)
+
+    sent = db.query(func.count(EmailOutbox.id)).filter(EmailOutbox.sent_at.isnot(None)).scalar()
+    pending = db.query(func.count(EmailOutbox.id)).filter(EmailOutbox.sent_at.is_(None)).scalar()
+    db.close()
+    latencies = [(accepted_at - started) * 1000 for accepted_at in sendgrid.accepted_at]
+    amadeus.stop()
+    sendgrid.stop()
+
+    return {
+        "notifications": args.notifications,
+        "distinct_routes": distinct_routes,
+        "elapsed_s": elapsed,
+        "alerts_sent": sent,
+        "alerts_pending": pending,
+        "alerts_per_s": sent / elapsed if elapsed else 0.0,
+        "amadeus_searches": amadeus.calls["/v2/shopping/flight-offers"],
+        "amadeus_token_calls": amadeus.calls["/v1/security/oauth2/token"],
+        "sendgrid_requests": sendgrid.calls["/v3/mail/send"],
+        "db_round_trips": round_trips,
+        "p50_alert_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_alert_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--notifications", type=int, default=5000)
+    parser.add_argument("--routes", type=int, default=200, help="distinct (origin, destination, date) routes")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for route popularity; 0 is uniform")
+    parser.add_argument("--offers", type=int, default=50, help="offers returned per search")
+    parser.add_argument("--amadeus-latency", type=float, default=0.2, help="seconds per Amadeus request")
+    parser.add_argument("--amadeus-error-rate", type=float, default=0.0)
+    parser.add_argument("--sendgrid-latency", type=float, default=0.05, help="seconds per SendGrid request")
+    parser.add_argument("--sendgrid-error-rate", type=float, default=0.0)
+    parser.add_argument("--database-url", default="sqlite:///./benchmark.db")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    result = run(args)
+    width = max(map(len, result))
+    for name, value in result.items():
+        print(f"{name:<{width}}  {value:.1f}" if isinstance(value, float) else f"{name:<{width}}  {value}")
+
+
+if __name__ == "__main__":
+    main()
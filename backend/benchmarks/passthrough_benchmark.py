@@ -0,0 +1,94 @@
+"""
+CPU time and allocations of turning an Amadeus response into our API response, before and after passthrough.
+
+- destinations decode/encode: the old path, json.loads of the upstream body, then {"data": ...} re-encoded by
+  FastAPI's JSONResponse
+- destinations passthrough: the upstream body handed on as it is (what /api/flight_destinations does now)
+- autocomplete JSONResponse / ORJSONResponse: encoding a reshaped list with the stdlib encoder and with orjson
+
+Allocations are measured with tracemalloc as the peak memory traced during one call.
+
+    cd backend && python -m benchmarks.passthrough_benchmark --offers 200 --iterations 500
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+
+def flight_destinations_body(offers, rng):
+    """
+    An Amadeus flight-destinations response with `offers` entries, as the upstream sends it.
+    """
+    data = [
+        {
+            "type": "flight-destination",
+            "origin": "MAD",
+            "destination": f"{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i // 676 % 26)}",
+            "departureDate": f"2025-06-{1 + i % 28:02d}",
+            "returnDate": f"2025-06-{2 + i % 27:02d}",
+            "price": {"total": f"{rng.uniform(30, 900):.2f}"},
+            "links": {
+                "flightDates": f"https://test.api.amadeus.com/v1/shopping/flight-dates?origin=MAD&destination=X{i}",
+                "flightOffers": f"https://test.api.amadeus.com/v2/shopping/flight-offers?originLocationCode=MAD&x={i}",
+            },
+        }
+        for i in range(offers)
+    ]
+    meta = {"currency": "EUR", "links": {"self": "https://test.api.amadeus.com/v1/shopping/flight-destinations?origin=MAD"}}
+    return json.dumps({"data": data, "dictionaries": {"currencies": {"EUR": "EURO"}}, "meta": meta}).encode()
+
+
+def autocomplete_data(count):
+    return [{"iataCode": f"L{i:02d}", "name": f"LONDON AIRPORT {i}", "cityName": "LONDON"} for i in range(count)]
+
+
+def decode_encode(body):
+    return JSONResponse(content={"data": json.loads(body)["data"]}).body
+
+
+def passthrough(body):
+    return body
+
+
+def measure(fn, arg, iterations):
+    started = time.process_time()
+    for _ in range(iterations):
+        fn(arg)
+    cpu_us = (time.process_time() - started) / iterations * 1e6
+
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_us": cpu_us, "peak_kb": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, default=200, help="flight destinations in the upstream response")
+    parser.add_argument("--locations", type=int, default=10, help="entries in the autocomplete response")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    body = flight_destinations_body(args.offers, random.Random(args.seed))
+    locations = autocomplete_data(args.locations)
+    cases = [
+        ("destinations decode/encode", decode_encode, body),
+        ("destinations passthrough", passthrough, body),
+        ("autocomplete JSONResponse", lambda data: JSONResponse(content=data).body, locations),
+        ("autocomplete ORJSONResponse", lambda data: ORJSONResponse(content=data).body, locations),
+    ]
+
+    print(f"upstream body {len(body) / 1024:.1f} KiB, {args.offers} offers, {args.iterations} iterations")
+    print(f"{'case':<30} {'cpu us/op':>10} {'peak KiB':>9}")
+    for name, fn, arg in cases:
+        result = measure(fn, arg, args.iterations)
+        print(f"{name:<30} {result['cpu_us']:>10.1f} {result['peak_kb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import pytest
+from unittest.mock import Mock
+from fastapi.testclient import TestClient
+from app import main
+from app.airport_index import AirportIndex, get_airport_index, normalize
+from app.amadeus_cache import amadeus_cache
+from app.amadeus_client import AmadeusAPIError
+from app.auth.dependencies import get_current_user
+
+
+@pytest.fixture(scope="module")
+def index():
+    return get_airport_index()
+
+
+def codes(locations):
+    return [location["iataCode"] for location in locations]
+
+
+def test_normalize_strips_case_accents_and_punctuation():
+    assert normalize(" Málaga-Costa del Sol ") == "MALAGA COSTA DEL SOL"
+
+
+def test_exact_code_ranks_first(index):
+    assert codes(index.search("LON"))[:2] == ["LON", "LHR"]
+    assert codes(index.search("bcn")) == ["BCN"]
+
+
+def test_search_by_city_name_lists_city_before_airports(index):
+    results = index.search("new york")
+    assert results[0]["subType"] == "CITY"
+    assert {"JFK", "EWR", "LGA"} <= set(codes(results))
+
+
+def test_search_by_later_words_of_airport_name(index):
+    assert codes(index.search("el prat")) == ["BCN"]
+
+
+def test_search_filters_sub_types(index):
+    assert "LON" not in codes(index.search("london", sub_types=("AIRPORT",)))
+
+
+def test_search_respects_limit(index):
+    assert len(index.search("s", limit=3)) == 3
+
+
+def test_search_miss_returns_empty(index):
+    assert index.search("zzzz") == []
+    assert index.search("  ") == []
+
+
+def test_locations_match_amadeus_shape():
+    index = AirportIndex([
+        {"type": "location", "subType": "AIRPORT", "name": "GRAN CANARIA", "iataCode": "LPA",
+         "address": {"cityName": "LAS PALMAS", "countryCode": "ES"}},
+    ])
+    location = index.search("palmas")[0]
+    assert location["address"]["cityName"] == "LAS PALMAS"
+
+
+def amadeus_location(code, city, sub_type="AIRPORT"):
+    return {"type": "location", "subType": sub_type, "name": f"{city} AIRPORT", "iataCode": code,
+            "address": {"cityName": city, "countryCode": "XX"}}
+
+
+class FakeAmadeus:
+    def __init__(self, locations=(), error=None):
+        self.locations_returned = list(locations)
+        self.error = error
+        self.calls = 0
+
+    async def locations(self, **params):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.locations_returned
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(amadeus_cache, "redis_getter", lambda: None)
+    amadeus_cache.l1.clear()
+    main.app.dependency_overrides[get_current_user] = lambda: Mock(id=1, email="a@example.com")
+    yield TestClient(main.app), lambda fake: monkeypatch.setattr(main, "amadeus", fake)
+    main.app.dependency_overrides.pop(get_current_user)
+
+
+def test_autocomplete_only_asks_amadeus_on_a_local_miss(api):
+    client, use = api
+    fake = FakeAmadeus([amadeus_location("XAP", "CHAPECO")])
+    use(fake)
+
+    assert codes(client.get("/api/airport_autocomplete", params={"term": "porto"}).json()) == ["OPO"]
+    assert fake.calls == 0
+    assert codes(client.get("/api/airport_autocomplete", params={"term": "chapeco"}).json()) == ["XAP"]
+    assert fake.calls == 1
+
+
+def test_search_tops_up_partial_local_hits_from_amadeus(api):
+    client, use = api
+    fake = FakeAmadeus([amadeus_location("POA", "PORTO ALEGRE"), amadeus_location("OPO", "PORTO")])
+    use(fake)
+
+    response = client.post("/api/search_location", json={"keyword": "porto"})
+
+    # Local match first, Amadeus' duplicate of it dropped
+    assert codes(response.json()["data"]) == ["OPO", "POA"]
+    assert fake.calls == 1
+
+
+def test_local_hits_survive_an_amadeus_failure(api):
+    client, use = api
+    use(FakeAmadeus(error=AmadeusAPIError(502, "down")))
+
+    response = client.post("/api/search_location", json={"keyword": "santiago"})
+
+    assert response.status_code == 200
+    assert codes(response.json()["data"]) == ["SCL", "SCQ"]
+
+
+@pytest.mark.parametrize("method, path, payload", [
+    ("get", "/api/airport_autocomplete", {"params": {"term": "zzqx"}}),
+    ("post", "/api/search_location", {"json": {"keyword": "zzqx"}}),
+])
+def test_rate_limited_lookups_return_429(api, method, path, payload):
+    client, use = api
+    use(FakeAmadeus(error=AmadeusAPIError(429, "rate limited")))
+
+    response = getattr(client, method)(path, **payload)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from app.amadeus_cache import AmadeusCache, TTLCache, MISSING, make_cache_key, encode_value, decode_value
+
+
+@pytest.fixture
+def cache():
+    # L1 only: no Redis available in the test environment
+    return AmadeusCache(redis_getter=lambda: None, l1_max_entries=2)
+
+
+def test_cache_key_ignores_param_order_case_and_none():
+    key = make_cache_key("locations", {"keyword": "lon", "subType": "AIRPORT", "page": None})
+    assert key == make_cache_key("locations", {"subType": "AIRPORT", "keyword": " LON "})
+    assert key != make_cache_key("flight_offers", {"subType": "AIRPORT", "keyword": "LON"})
+
+
+def test_get_or_fetch_calls_upstream_once(cache):
+    fetch = Mock(return_value=[{"iataCode": "LHR"}])
+
+    assert cache.get_or_fetch("locations", {"keyword": "LON"}, fetch) == [{"iataCode": "LHR"}]
+    assert cache.get_or_fetch("locations", {"keyword": "lon"}, fetch) == [{"iataCode": "LHR"}]
+    assert fetch.call_count == 1
+    assert cache.cache_stats()["locations"] == {"l1_hits": 1, "l2_hits": 0, "misses": 1, "coalesced": 0}
+
+
+def test_get_or_fetch_does_not_cache_errors(cache):
+    fetch = Mock(side_effect=RuntimeError("upstream down"))
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("locations", {"keyword": "LON"}, fetch)
+    assert cache.get("locations", {"keyword": "LON"}) is MISSING
+
+
+def test_l1_evicts_least_recently_used():
+    l1 = TTLCache(max_entries=2)
+    l1.set("a", 1, ttl=60)
+    l1.set("b", 2, ttl=60)
+    l1.get("a")
+    l1.set("c", 3, ttl=60)
+
+    assert l1.get("b") is MISSING
+    assert l1.get("a") == 1
+    assert l1.get("c") == 3
+
+
+def test_l1_expires_entries():
+    l1 = TTLCache(max_entries=2)
+    l1.set("a", 1, ttl=0)
+    assert l1.get("a") is MISSING
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_misses_share_one_fetch(cache):
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [{"type": "flight-destination", "destination": "BCN"}]
+
+    params = {"origin": "MAD", "departureDate": "2025-06-01"}
+    results = await asyncio.gather(*(cache.get_or_fetch_async("flight_destinations", params, fetch) for _ in range(20)))
+
+    assert calls == 1
+    assert all(result == results[0] for result in results)
+    assert cache.cache_stats()["flight_destinations"]["coalesced"] == 19
+
+
+def test_redis_values_keep_raw_bodies_as_bytes():
+    body = b'{"data":[{"destination":"PAR"}]}'
+
+    assert decode_value(encode_value(body)) == body
+    assert decode_value(encode_value([{"iataCode": "LHR"}]).encode()) == [{"iataCode": "LHR"}]
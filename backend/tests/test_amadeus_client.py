@@ -0,0 +1,93 @@
+import asyncio
+import httpx
+import pytest
+from app.amadeus_client import AsyncAmadeusClient, AmadeusAPIError, encode_params
+
+
+def make_client(handler):
+    return AsyncAmadeusClient("id", "secret", base_url="https://amadeus.test", http2=False,
+                              transport=httpx.MockTransport(handler))
+
+
+def test_encode_params():
+    assert encode_params({"origin": "MAD", "oneWay": False, "maxPrice": None}) == {"origin": "MAD", "oneWay": "false"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_token():
+    calls = {"token": 0, "locations": 0}
+
+    async def handler(request):
+        if request.url.path == "/v1/security/oauth2/token":
+            calls["token"] += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"access_token": "abc", "expires_in": 1799})
+        calls["locations"] += 1
+        assert request.headers["Authorization"] == "Bearer abc"
+        assert request.url.params["keyword"] == "LON"
+        return httpx.Response(200, json={"data": [{"iataCode": "LHR"}]})
+
+    client = make_client(handler)
+    results = await asyncio.gather(*(client.locations(keyword="LON", subType="AIRPORT") for _ in range(10)))
+    await client.aclose()
+
+    assert all(result == [{"iataCode": "LHR"}] for result in results)
+    assert calls == {"token": 1, "locations": 10}
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_refreshed_once():
+    tokens = iter(["old", "new"])
+
+    def handler(request):
+        if request.url.path == "/v1/security/oauth2/token":
+            return httpx.Response(200, json={"access_token": next(tokens), "expires_in": 1799})
+        if request.headers["Authorization"] == "Bearer old":
+            return httpx.Response(401, json={"errors": [{"title": "Invalid access token"}]})
+        return httpx.Response(200, json={"data": []})
+
+    client = make_client(handler)
+    assert await client.locations(keyword="PAR") == []
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_body_is_returned_undecoded():
+    body = b'{"data":[{"destination":"PAR","price":{"total":"79.20"}}],"meta":{"currency":"EUR"}}'
+
+    def handler(request):
+        if request.url.path == "/v1/security/oauth2/token":
+            return httpx.Response(200, json={"access_token": "abc", "expires_in": 1799})
+        return httpx.Response(200, content=body, headers={"Content-Type": "application/vnd.amadeus+json"})
+
+    client = make_client(handler)
+    assert await client.flight_destinations_body(origin="MAD") == body
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_error_status_raises_amadeus_api_error():
+    def handler(request):
+        if request.url.path == "/v1/security/oauth2/token":
+            return httpx.Response(200, json={"access_token": "abc", "expires_in": 1799})
+        return httpx.Response(500, json={"errors": [{"title": "SYSTEM ERROR HAS OCCURRED"}]})
+
+    client = make_client(handler)
+    with pytest.raises(AmadeusAPIError) as error:
+        await client.flight_destinations_body(origin="MAD")
+    await client.aclose()
+
+    assert error.value.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_timeout_raises_amadeus_api_error():
+    def handler(request):
+        raise httpx.ReadTimeout("too slow", request=request)
+
+    client = make_client(handler)
+    with pytest.raises(AmadeusAPIError) as error:
+        await client.locations(keyword="LON")
+    await client.aclose()
+
+    assert error.value.status_code == 504
@@ -0,0 +1,171 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import Mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import FlightNotification, User, EmailOutbox, PriceObservation
+from app import celery_worker
+from app.celery_worker import (
+    group_notifications_by_route,
+    group_max_price,
+    claim_due_notifications,
+    build_shards,
+    process_notifications,
+    relay_pending_emails,
+    search_flights,
+)
+from app.scheduling import compute_next_due_at
+
+NOW = datetime(2025, 5, 1, 12, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="test@test.com", hashed_password="x"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def make_notification(id, origin="MAD", destination="BCN", departure_date="2025-05-01", max_price=None):
+    return Mock(id=id, origin=origin, destination=destination, departure_date=departure_date, max_price=max_price)
+
+
+def test_group_notifications_by_route():
+    notifications = [
+        make_notification(1),
+        make_notification(2),
+        make_notification(3, destination="LPA"),
+        make_notification(4, departure_date="2025-05-02"),
+    ]
+    routes = group_notifications_by_route(notifications)
+
+    assert len(routes) == 3
+    assert [n.id for n in routes[("MAD", "BCN", "2025-05-01")]] == [1, 2]
+
+
+def test_group_max_price_uses_highest_limit():
+    notifications = [make_notification(1, max_price=Decimal("69.89")), make_notification(2, max_price=Decimal("120.10"))]
+    assert group_max_price(notifications) == 121
+
+
+def test_group_max_price_unlimited_when_any_subscriber_has_no_limit():
+    notifications = [make_notification(1, max_price=Decimal("69.89")), make_notification(2, max_price=None)]
+    assert group_max_price(notifications) is None
+
+
+def test_claim_due_notifications_claims_due_active_rows_in_batches(db):
+    due_times = [NOW - timedelta(hours=3), NOW - timedelta(hours=1), NOW, NOW + timedelta(minutes=1)]
+    for i, due_at in enumerate(due_times, start=1):
+        db.add(FlightNotification(id=i, user_id=1, origin="MAD", destination="BCN", departure_date="2025-06-01",
+                                  frequency=1, frequency_unit="hours", next_due_at=due_at))
+    db.add(FlightNotification(id=5, user_id=1, origin="MAD", destination="BCN", departure_date="2025-06-01",
+                              frequency=1, frequency_unit="hours", next_due_at=NOW - timedelta(days=1),
+                              is_active=False))
+    db.commit()
+    claimed_until = NOW + timedelta(minutes=10)
+
+    first = claim_due_notifications(db, NOW, claimed_until, batch_size=2)
+    second = claim_due_notifications(db, NOW, claimed_until, batch_size=2)
+    third = claim_due_notifications(db, NOW, claimed_until, batch_size=2)
+
+    assert sorted(row.id for row in first) == [1, 2]
+    assert [row.id for row in second] == [3]
+    assert third == []
+    assert db.get(FlightNotification, 1).next_due_at == claimed_until
+    assert db.get(FlightNotification, 4).next_due_at == NOW + timedelta(minutes=1)
+
+
+def test_build_shards_keeps_routes_together():
+    claimed = (
+        [make_notification(i) for i in range(1, 4)]
+        + [make_notification(i, destination="LPA") for i in range(4, 7)]
+        + [make_notification(i, destination="ROM") for i in range(7, 13)]
+        + [make_notification(13, destination="PAR")]
+    )
+
+    shards = build_shards(claimed, shard_size=5)
+
+    assert shards == [[1, 2, 3], [4, 5, 6], [7, 8, 9, 10, 11], [12, 13]]
+
+
+def test_compute_next_due_at():
+    notification = Mock(frequency=2, frequency_unit="hours")
+    assert compute_next_due_at(notification, NOW) == NOW + timedelta(hours=2)
+
+    with pytest.raises(ValueError):
+        compute_next_due_at(Mock(frequency=1, frequency_unit="fortnights"), NOW)
+
+
+def make_offer(total):
+    return {
+        "price": {"total": total, "currency": "EUR"},
+        "itineraries": [{
+            "duration": "PT1H20M",
+            "segments": [{
+                "departure": {"iataCode": "MAD", "at": "2025-06-01T10:00:00"},
+                "arrival": {"iataCode": "BCN", "at": "2025-06-01T11:20:00"},
+                "duration": "PT1H20M",
+            }],
+        }],
+    }
+
+
+def test_process_notifications_writes_outbox_and_updates_batch(db, monkeypatch):
+    search_flights = Mock(return_value=[make_offer("60.00"), make_offer("90.00")])
+    relay = Mock()
+    monkeypatch.setattr(celery_worker, "search_flights", search_flights)
+    monkeypatch.setattr(celery_worker.relay_outbox, "delay", relay)
+    claimed_until = NOW - timedelta(minutes=1)
+    for i, (max_price, unit) in enumerate([(Decimal("70"), "hours"), (Decimal("50"), "hours"), (None, "days")], start=1):
+        db.add(FlightNotification(id=i, user_id=1, origin="MAD", destination="BCN", departure_date="2025-06-01",
+                                  max_price=max_price, frequency=1, frequency_unit=unit, next_due_at=claimed_until))
+    db.commit()
+
+    process_notifications(db, db.query(FlightNotification).order_by(FlightNotification.id).all(), NOW)
+    # Replaying the same claim must not enqueue the emails again
+    for notification in db.query(FlightNotification).all():
+        notification.next_due_at = claimed_until
+    db.commit()
+    process_notifications(db, db.query(FlightNotification).order_by(FlightNotification.id).all(), NOW)
+
+    search_flights.assert_called_with(origin="MAD", destination="BCN", departure_date="2025-06-01", max_price=None)
+    assert [row.notification_id for row in db.query(EmailOutbox).order_by(EmailOutbox.id)] == [1, 3]
+    assert db.get(FlightNotification, 2).last_notification == NOW
+    assert db.get(FlightNotification, 1).next_due_at == NOW + timedelta(hours=1)
+    assert db.get(FlightNotification, 3).next_due_at == NOW + timedelta(days=1)
+    assert db.query(PriceObservation).one().min_price == Decimal("60.00")
+
+
+def test_relay_pending_emails_marks_sent_and_records_failures(db, monkeypatch):
+    for i, email in enumerate(["ok@example.com", "bad@example.com"], start=1):
+        db.add(EmailOutbox(id=i, notification_id=i, to_email=email, subject="Flight Price Alert",
+                           content=f"body {i}", dedupe_key=f"{i}:slot"))
+    db.commit()
+
+    def send_batch(messages):
+        return [
+            {"messages": [m], "recipients": [m["to_email"]], **({"error": "rejected"} if "bad" in m["to_email"] else {})}
+            for m in messages
+        ]
+
+    monkeypatch.setattr(celery_worker, "send_batch", send_batch)
+
+    assert relay_pending_emails(db) == 1
+    ok, bad = db.get(EmailOutbox, 1), db.get(EmailOutbox, 2)
+    assert ok.sent_at is not None and ok.attempts == 1
+    assert bad.sent_at is None and bad.attempts == 1 and bad.last_error == "rejected"
+
+
+def test_search_flights_omits_missing_max_price(monkeypatch):
+    cached_call = Mock(return_value=[])
+    monkeypatch.setattr(celery_worker, "cached_call", cached_call)
+
+    search_flights("MAD", "BCN", "2025-06-01", None)
+
+    assert "maxPrice" not in cached_call.call_args.args[1]
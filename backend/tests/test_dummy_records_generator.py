@@ -0,0 +1,49 @@
+import random
+from collections import Counter
+from datetime import datetime
+from unittest.mock import Mock
+from app.dummy_records_generator import (
+    NOTIFICATION_COLUMNS,
+    RouteSampler,
+    copy_rows,
+    load_airport_codes,
+    make_routes,
+    notification_rows,
+)
+
+TODAY = datetime(2025, 5, 1)
+
+
+def generate_notifications(seed, count=2000):
+    rng = random.Random(seed)
+    sampler = RouteSampler(make_routes(100, rng, load_airport_codes()), skew=1.2, rng=rng)
+    return list(notification_rows(count, (1, 50), sampler, rng, TODAY))
+
+
+def test_same_seed_same_rows():
+    assert generate_notifications(7) == generate_notifications(7)
+    assert generate_notifications(7) != generate_notifications(8)
+
+
+def test_route_popularity_is_skewed():
+    rows = generate_notifications(7)
+    counts = Counter((row[1], row[2]) for row in rows).most_common()
+
+    assert len(rows[0]) == len(NOTIFICATION_COLUMNS)
+    # Rank 1 gets 1 / H(100, 1.2) ~ 27% of the picks under Zipf(1.2), against 1% if uniform
+    assert counts[0][1] > 0.15 * len(rows)
+    assert counts[0][1] > 10 * counts[-1][1]
+
+
+def test_copy_rows_streams_chunks_as_csv():
+    cursor = Mock()
+    copied_chunks = []
+    cursor.copy_expert.side_effect = lambda statement, buffer: copied_chunks.append(buffer.read())
+    connection = Mock()
+    connection.connection.cursor.return_value = cursor
+
+    copied = copy_rows(connection, "users", ("id", "email"), iter([(1, "a@x.com"), (2, None), (3, "c@x.com")]), chunk_size=2)
+
+    assert copied == 3
+    assert cursor.copy_expert.call_args.args[0] == "COPY users (id, email) FROM STDIN WITH (FORMAT csv)"
+    assert copied_chunks == ["1,a@x.com\r\n2,\r\n", "3,c@x.com\r\n"]
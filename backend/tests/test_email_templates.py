@@ -0,0 +1,66 @@
+from decimal import Decimal
+from unittest.mock import Mock
+import pytest
+from app import email_templates
+from app.email_templates import format_email_body, render_alert_email, offer_set_key
+from app.offers import Offer
+
+
+@pytest.fixture(autouse=True)
+def clear_section_cache():
+    email_templates.section_cache.clear()
+    yield
+    email_templates.section_cache.clear()
+
+
+def make_offer(cents, minutes, link="https://example.com/offer"):
+    return Offer(cents, "EUR", minutes, "MAD", "BCN", "2025-06-01T10:00:00", link)
+
+
+def make_notification(max_price=None):
+    return Mock(origin="MAD", destination="BCN", departure_date="2025-06-01", max_price=max_price,
+                frequency=1, frequency_unit="hours")
+
+
+def test_format_email_body_ranks_offers():
+    body = format_email_body([make_offer(9000, 150), make_offer(6000, 300), make_offer(7500, 45)])
+    cheapest_section, shortest_section = body.split("Shortest Duration Flights:")
+
+    assert cheapest_section.index("60.00 EUR") < cheapest_section.index("75.00 EUR") < cheapest_section.index("90.00 EUR")
+    assert shortest_section.index("0h 45m") < shortest_section.index("2h 30m") < shortest_section.index("5h 0m")
+    assert format_email_body([]) == "No flights found matching your criteria."
+
+
+def test_sections_are_rendered_once_per_offer_set(monkeypatch):
+    render_offer = Mock(wraps=email_templates.render_offer)
+    monkeypatch.setattr(email_templates, "render_offer", render_offer)
+    offers = [make_offer(6000, 80), make_offer(9000, 60)]
+
+    first = render_alert_email(make_notification(), offers)
+    second = render_alert_email(make_notification(Decimal("100")), offers)
+    third = render_alert_email(make_notification(Decimal("100")), offers)
+
+    assert render_offer.call_count == 4
+    assert first.startswith("Here are the flights from MAD to BCN")
+    assert "alert for MAD-BCN on 2025-06-01." in first
+    # Same route and offers, same content whatever the subscription settings: one SendGrid request for all
+    assert first == second == third
+
+
+def test_offer_set_key_changes_with_offers():
+    offers = [make_offer(6000, 80)]
+    assert offer_set_key(offers) == offer_set_key([make_offer(6000, 80)])
+    assert offer_set_key(offers) != offer_set_key([make_offer(6100, 80)])
+    assert offer_set_key(offers) != offer_set_key([make_offer(6000, 80, link="https://example.com/other")])
+
+
+def test_offers_outside_both_rankings_do_not_split_the_cache(monkeypatch):
+    render_offer = Mock(wraps=email_templates.render_offer)
+    monkeypatch.setattr(email_templates, "render_offer", render_offer)
+    ranked = [make_offer(5000 + i, 60 + i) for i in range(5)]
+
+    first = format_email_body(ranked + [make_offer(90000, 900)])
+    second = format_email_body(ranked + [make_offer(80000, 800, link="https://example.com/other")])
+
+    assert first == second
+    assert render_offer.call_count == 10
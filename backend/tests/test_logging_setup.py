@@ -0,0 +1,89 @@
+import os
+import json
+import queue
+import logging
+import pytest
+from app import logging_setup
+from app.logging_setup import JsonFormatter, NonBlockingQueueHandler, SamplingFilter, parse_sample_rates
+
+
+def make_record(name="app.celery_worker", level=logging.INFO, msg="Processing %s notifications", args=(3,), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_writes_one_object_per_record():
+    entry = json.loads(JsonFormatter().format(make_record(task_id="abc")))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.celery_worker"
+    assert entry["message"] == "Processing 3 notifications"
+    assert entry["task_id"] == "abc"
+    assert entry["time"].endswith("+00:00")
+
+
+def test_sampling_applies_to_the_logger_and_its_children_below_warning():
+    sampling = SamplingFilter(parse_sample_rates("app.main.requests=0, app.amadeus_cache=1"))
+
+    assert not sampling.filter(make_record("app.main.requests"))
+    assert not sampling.filter(make_record("app.main.requests.autocomplete", logging.DEBUG))
+    assert sampling.filter(make_record("app.main.requests", logging.WARNING))
+    assert sampling.filter(make_record("app.main"))
+
+    kept = make_record("app.amadeus_cache")
+    assert sampling.filter(kept) and kept.sample_rate == 1
+
+
+def test_queue_handler_defers_formatting_of_immutable_args_and_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    handler.handle(make_record(msg="Offer %s at %.2f", args=("MAD-JFK", 99.5)))
+    handler.handle(make_record())
+
+    record = handler.queue.get_nowait()
+    assert record.args == ("MAD-JFK", 99.5)
+    assert handler.dropped == 1
+    assert JsonFormatter().format(record).count("Offer MAD-JFK at 99.50") == 1
+
+
+def test_queue_handler_formats_mutable_args_when_logged():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    offers = [120]
+    handler.handle(make_record(msg="Offers %s", args=(offers,)))
+    offers.append(80)
+
+    assert json.loads(JsonFormatter().format(handler.queue.get_nowait()))["message"] == "Offers [120]"
+
+
+@pytest.fixture
+def file_logging(tmp_path, monkeypatch):
+    root = logging.getLogger()
+    saved = (logging_setup.queue_handler, logging_setup.listener)
+    if saved[0] is not None:
+        root.removeHandler(saved[0])
+    monkeypatch.setattr(logging_setup, "LOG_DIR", str(tmp_path))
+    logging_setup.queue_handler = logging_setup.listener = None
+    handler = logging_setup.setup_logging("fork.log", sample_rates={})
+    yield tmp_path / "fork.log"
+    logging_setup.stop_logging()
+    root.removeHandler(handler)
+    logging_setup.queue_handler, logging_setup.listener = saved
+    if saved[0] is not None:
+        root.addHandler(saved[0])
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_gets_its_own_listener(file_logging):
+    logging.getLogger("app.test").warning("from the parent")
+    pid = os.fork()
+    if pid == 0:
+        try:
+            logging.getLogger("app.test").warning("from the child")
+            logging_setup.stop_logging()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    logging_setup.stop_logging()
+
+    messages = [json.loads(line)["message"] for line in file_logging.read_text().splitlines()]
+    assert sorted(messages) == ["from the child", "from the parent"]
@@ -0,0 +1,72 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.main import app
+from app import logging_setup, metrics
+from app.metrics import db_stage, observe_upstream
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_endpoint_reports_route_latency_and_app_stats():
+    client = TestClient(app)
+    client.get("/metrics")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    # Labelled by route template, and the previous scrape has been recorded
+    assert 'http_request_duration_seconds_count{method="GET",route="/metrics",status="200"}' in response.text
+    assert "amadeus_rate_limiter_total" in response.text
+    assert "password_hash_queued" in response.text
+    assert "log_records_dropped_total" in response.text
+
+
+def test_unmatched_paths_share_one_label():
+    client = TestClient(app)
+    before = sample("http_request_duration_seconds_count", {"method": "GET", "route": "unmatched", "status": "404"})
+
+    client.get("/no/such/page/1")
+    client.get("/no/such/page/2")
+
+    assert sample("http_request_duration_seconds_count", {"method": "GET", "route": "unmatched", "status": "404"}) == before + 2
+
+
+def test_db_stage_records_even_when_the_stage_fails():
+    before = sample("db_stage_duration_seconds_count", {"stage": "test_stage"})
+
+    with db_stage("test_stage"):
+        pass
+    with pytest.raises(RuntimeError):
+        with db_stage("test_stage"):
+            raise RuntimeError("deadlock")
+
+    assert sample("db_stage_duration_seconds_count", {"stage": "test_stage"}) == before + 2
+
+
+def test_observe_upstream_labels_status():
+    labels = {"service": "sendgrid", "endpoint": "/v3/mail/send", "status": "202"}
+    before = sample("upstream_request_duration_seconds_count", labels)
+
+    observe_upstream("sendgrid", "/v3/mail/send", 202, time.perf_counter())
+
+    assert sample("upstream_request_duration_seconds_count", labels) == before + 1
+
+
+def test_clear_multiproc_dir_removes_previous_runs_samples(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    for name in ("counter_7.db", "histogram_7.db", "README"):
+        (tmp_path / name).write_text("")
+
+    metrics.clear_multiproc_dir()
+
+    assert [path.name for path in tmp_path.iterdir()] == ["README"]
+
+
+def test_dropped_log_records_are_exported(monkeypatch):
+    monkeypatch.setattr(logging_setup.queue_handler, "dropped", 3)
+
+    assert sample("log_records_dropped_total", {}) == 3
@@ -1,7 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app  # Assuming 'app' is your FastAPI instance
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import FlightNotification
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -30,6 +30,7 @@ def override_get_current_user():
 @pytest.fixture(scope="module")
 def client():
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     app.dependency_overrides[get_current_user] = override_get_current_user
     client = TestClient(app)
     yield client
@@ -132,3 +133,74 @@ def test_create_and_delete_notification(client):
     response = client.get("/notify/notify/notifications/")
     notifications = response.json()
     assert all(notification["id"] != notification_id for notification in notifications)
+
+def create_notifications(client, count):
+    data = {"origin": "MAD", "destination": "BCN", "departure_date": "2025-03-01", "max_price": 80,
+            "frequency": 1, "frequency_unit": "days"}
+    return [client.post("/notify/notify/notifications/", json=data).json()["id"] for _ in range(count)]
+
+def test_list_notifications_pages_with_cursor(client):
+    ids = create_notifications(client, 5)
+
+    first = client.get("/notify/notify/notifications/", params={"after": ids[0] - 1, "limit": 3})
+    second = client.get("/notify/notify/notifications/", params={"after": first.headers["X-Next-Cursor"], "limit": 3})
+
+    assert [n["id"] for n in first.json()] == ids[:3]
+    assert [n["id"] for n in second.json()] == ids[3:]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_list_notifications_projects_fields(client):
+    response = client.get("/notify/notify/notifications/", params={"fields": "origin,destination"})
+
+    assert response.status_code == 200
+    assert all(set(n) == {"id", "origin", "destination"} for n in response.json())
+    assert client.get("/notify/notify/notifications/", params={"fields": "password"}).status_code == 400
+
+def test_list_notifications_etag(client):
+    from app.models import User
+    db = TestingSessionLocal()
+    if db.get(User, 1) is None:
+        db.add(User(id=1, email="testuser@test.com", hashed_password="x"))
+        db.commit()
+    db.close()
+
+    etag = client.get("/notify/notify/notifications/").headers["ETag"]
+    assert client.get("/notify/notify/notifications/", headers={"If-None-Match": etag}).status_code == 304
+
+    create_notifications(client, 1)
+    response = client.get("/notify/notify/notifications/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_bulk_create_pause_and_delete(client):
+    data = [
+        {"origin": "MAD", "destination": "LPA", "departure_date": f"2025-04-{day:02d}", "max_price": 90,
+         "frequency": 1, "frequency_unit": "days"}
+        for day in range(1, 31)
+    ]
+    response = client.post("/notify/notify/notifications/bulk/", json=data)
+    assert response.status_code == 200
+    created = response.json()
+    ids = [n["id"] for n in created]
+    assert [n["departure_date"] for n in created] == [d["departure_date"] for d in data]
+
+    response = client.patch("/notify/notify/notifications/bulk/", json={"ids": ids[:10] + [999999], "is_active": False})
+    assert response.json() == {"ids": ids[:10]}
+    db = TestingSessionLocal()
+    assert db.query(FlightNotification).filter(FlightNotification.id.in_(ids), FlightNotification.is_active == False).count() == 10
+    db.close()
+
+    response = client.request("DELETE", "/notify/notify/notifications/bulk/", json={"ids": ids})
+    assert response.json() == {"ids": ids}
+    remaining = client.get("/notify/notify/notifications/", params={"limit": 500}).json()
+    assert not set(ids) & {n["id"] for n in remaining}
+
+def test_bulk_create_validates_whole_batch(client):
+    good = {"origin": "MAD", "destination": "LPA", "departure_date": "2025-04-01", "max_price": 90,
+            "frequency": 1, "frequency_unit": "days"}
+    before = len(client.get("/notify/notify/notifications/", params={"limit": 500}).json())
+
+    response = client.post("/notify/notify/notifications/bulk/", json=[good, {**good, "max_price": -1}])
+
+    assert response.status_code == 422
+    assert len(client.get("/notify/notify/notifications/", params={"limit": 500}).json()) == before
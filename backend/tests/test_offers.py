@@ -0,0 +1,72 @@
+from decimal import Decimal
+from app.offers import (
+    Offer,
+    parse_duration_minutes,
+    format_duration,
+    parse_offers,
+    filter_offers_by_price,
+    cheapest,
+    shortest,
+)
+
+
+def make_flight(total, duration="PT2H30M", segment_durations=("PT2H30M",)):
+    return {
+        "price": {"total": total, "currency": "EUR"},
+        "itineraries": [{
+            "duration": duration,
+            "segments": [
+                {
+                    "departure": {"iataCode": "MAD" if i == 0 else "LIS", "at": "2025-06-01T10:00:00"},
+                    "arrival": {"iataCode": "BCN" if i == len(segment_durations) - 1 else "LIS"},
+                    "duration": segment_duration,
+                }
+                for i, segment_duration in enumerate(segment_durations)
+            ],
+        }],
+        "meta": {"links": {"self": "https://example.com/offer"}},
+    }
+
+
+def test_parse_duration_minutes():
+    assert parse_duration_minutes("PT2H30M") == 150
+    assert parse_duration_minutes("PT45M") == 45
+    assert parse_duration_minutes("PT3H") == 180
+    assert parse_duration_minutes("P1DT2H") == 1560
+    assert parse_duration_minutes("2 hours") is None
+    assert parse_duration_minutes(None) is None
+    assert format_duration("PT2H30M") == "2h 30m"
+
+
+def test_offer_from_amadeus():
+    offer = Offer.from_amadeus(make_flight("123.45", duration=None, segment_durations=("PT1H", "PT1H15M")))
+
+    assert offer.price_cents == 12345
+    assert offer.duration_minutes == 135
+    assert (offer.origin, offer.destination) == ("MAD", "BCN")
+    assert offer.booking_link == "https://example.com/offer"
+
+
+def test_parse_offers_skips_malformed():
+    offers = parse_offers([make_flight("10.00"), {"id": "2", "price": {}}])
+    assert [offer.price_cents for offer in offers] == [1000]
+
+
+def test_filter_offers_by_price():
+    offers = parse_offers([make_flight(total) for total in ("50.00", "69.89", "69.90", "150.00")])
+
+    assert filter_offers_by_price(offers, Decimal("69.89")) == offers[:2]
+    assert filter_offers_by_price(offers, 100) == offers[:3]
+    assert filter_offers_by_price(offers, None) == offers
+
+
+def test_top_k_selection():
+    offers = parse_offers([
+        make_flight(f"{100 + i}.00", duration=f"PT{(i * 7) % 10 + 1}H") for i in range(250)
+    ])
+
+    assert [o.price_cents for o in cheapest(offers)] == [10000, 10100, 10200, 10300, 10400]
+    # PT2H30M is 150 minutes, not the 230 the old string-stripping sort key produced
+    mixed = parse_offers([make_flight("10.00", "PT3H"), make_flight("20.00", "PT2H30M")])
+    assert [o.duration_minutes for o in shortest(mixed, k=2)] == [150, 180]
+    assert all(o.duration_minutes == 60 for o in shortest(offers))
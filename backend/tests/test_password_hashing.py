@@ -0,0 +1,41 @@
+import threading
+import pytest
+from app.auth.hashing import PasswordHasher, HashingBusy
+
+PASSWORD = "74£MXy@TM;(TuHJ6La"
+
+
+def test_hash_and_verify_run_on_the_pool():
+    hasher = PasswordHasher(rounds=4, workers=2, max_pending=4)
+
+    hashed = hasher.hash(PASSWORD)
+
+    assert hasher.verify(PASSWORD, hashed)
+    assert not hasher.verify("wrong", hashed)
+    stats = hasher.hashing_stats()
+    assert stats["completed"] == 3 and stats["pending"] == 0 and stats["rejected"] == 0
+    hasher.shutdown()
+
+
+def test_full_queue_rejects_instead_of_waiting():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash(password):
+        started.set()
+        release.wait(5)
+        return "hashed"
+
+    hasher.context = type("SlowContext", (), {"hash": staticmethod(slow_hash)})()
+    worker = threading.Thread(target=hasher.hash, args=(PASSWORD,))
+    worker.start()
+    started.wait(5)
+
+    with pytest.raises(HashingBusy):
+        hasher.hash(PASSWORD)
+
+    release.set()
+    worker.join()
+    assert hasher.hashing_stats()["rejected"] == 1
+    hasher.shutdown()
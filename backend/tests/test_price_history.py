@@ -0,0 +1,81 @@
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.offers import Offer
+from app.price_history import summarize_offers, record_observations, get_route_history, month_starts
+
+NOW = datetime(2025, 5, 1, 12, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def make_flight(total):
+    return Offer(int(Decimal(total) * 100), "EUR", 80, "MAD", "BCN", "2025-06-01T10:00:00")
+
+
+def test_summarize_offers():
+    flights = [make_flight("90.00"), make_flight("60.00"), make_flight("75.50"), make_flight("120.00")]
+
+    observation = summarize_offers("MAD", "BCN", "2025-06-01", flights, NOW, search_max_price=150)
+
+    assert observation["departure_date"] == date(2025, 6, 1)
+    assert observation["min_price"] == Decimal("60.00")
+    assert observation["median_price"] == Decimal("82.75")
+    assert observation["offer_count"] == 4
+    assert observation["currency"] == "EUR"
+
+
+def test_summarize_offers_skips_empty_or_unparseable():
+    assert summarize_offers("MAD", "BCN", "2025-06-01", [], NOW) is None
+    assert summarize_offers("MAD", "BCN", "2025-06-01,2025-06-05", [make_flight("10.00")], NOW) is None
+
+
+def test_month_starts_crosses_year_end():
+    assert list(month_starts(date(2025, 11, 17), 3)) == [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)]
+
+
+def test_get_route_history_filters_route_and_window(db):
+    rows = [
+        summarize_offers(origin, "BCN", "2025-06-01", [make_flight(price)], NOW - timedelta(days=days))
+        for origin, price, days in [("MAD", "80.00", 1), ("MAD", "70.00", 0), ("MAD", "60.00", 45), ("LON", "99.00", 0)]
+    ]
+    record_observations(db, rows)
+    # Recording the same observation twice keeps the first one
+    record_observations(db, rows[:1])
+
+    history = get_route_history(db, "MAD", "BCN", until=NOW)
+
+    assert [o.min_price for o in history] == [Decimal("70.00"), Decimal("80.00")]
+
+
+def test_get_route_history_keeps_the_newest_rows(db):
+    record_observations(db, [
+        summarize_offers("MAD", "BCN", "2025-06-01", [make_flight(f"{50 + hours}.00")], NOW - timedelta(hours=hours))
+        for hours in range(5)
+    ])
+
+    history = get_route_history(db, "MAD", "BCN", until=NOW, limit=2)
+
+    assert [o.observed_at for o in history] == [NOW, NOW - timedelta(hours=1)]
+
+
+def test_route_history_index_is_used_without_a_departure_date(db):
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM price_observations WHERE origin = 'MAD' AND destination = 'BCN' "
+        "AND observed_at >= '2025-04-01' ORDER BY observed_at DESC, departure_date DESC LIMIT 10"
+    )).all()
+
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_price_observations_route_observed_at" in details
+    # Already in order: no sort of the whole window before the limit
+    assert "TEMP B-TREE" not in details
@@ -0,0 +1,87 @@
+import os
+import time
+import threading
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import profiling
+from app.profiling import SamplingProfiler, prune_profiles, write_profile
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profiler_collapses_the_target_threads_stacks():
+    profiler = SamplingProfiler({threading.get_ident()}, interval=0.001).start()
+    busy_loop(0.1)
+    profiler.stop()
+
+    lines = profiler.collapsed().splitlines()
+    assert profiler.samples > 10
+    # Root first: thread name, then frames down to the leaf, then the sample count
+    assert any(line.startswith("MainThread;") and "busy_loop (test_profiling.py:" in line for line in lines)
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+
+
+def test_profiles_rotate(tmp_path):
+    for _ in range(5):
+        profiler = SamplingProfiler(interval=0.001).start().stop()
+        write_profile(profiler, "task", "app.celery_worker.check_and_send_notifications", str(tmp_path), keep=3)
+
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 3
+    assert all("-task-app_celery_worker_check_and_send_notifications-" in name for name in files)
+
+    prune_profiles(str(tmp_path), 0)
+    assert os.listdir(tmp_path) == []
+
+
+def make_app():
+    app = FastAPI()
+    app.middleware("http")(profiling.profile_requests)
+
+    @app.get("/slow")
+    def slow():
+        busy_loop(0.02)
+        return {"ok": True}
+
+    return app
+
+
+def test_requests_are_profiled_only_with_the_admin_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "s3cret")
+    monkeypatch.setattr(profiling, "PROFILE_REQUEST_SAMPLE_RATE", 0)
+    client = TestClient(make_app())
+
+    assert "X-Profile-File" not in client.get("/slow").headers
+    assert "X-Profile-File" not in client.get("/slow", headers={"X-Profile": "guess"}).headers
+    response = client.get("/slow", headers={"X-Profile": "s3cret"})
+
+    assert response.json() == {"ok": True}
+    assert os.listdir(tmp_path) == [response.headers["X-Profile-File"]]
+    assert "-request-GET_slow-" in response.headers["X-Profile-File"]
+
+
+def test_task_hooks_profile_selected_tasks(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_TASK_SAMPLE_RATE", 1)
+    selected = SimpleNamespace(name="app.celery_worker.check_and_send_notifications")
+    other = SimpleNamespace(name="app.celery_worker.relay_outbox")
+
+    for task_id, task in (("1", selected), ("2", other)):
+        profiling.start_task_profile(task_id=task_id, task=task)
+        busy_loop(0.01)
+        profiling.finish_task_profile(task_id=task_id, task=task)
+
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and "check_and_send_notifications" in files[0]
+    assert profiling.running_task_profiles == {}
+
+
+def test_everything_is_off_by_default():
+    assert not profiling.request_profiling_enabled()
+    assert not profiling.connect_task_profiling()
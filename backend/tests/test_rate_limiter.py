@@ -0,0 +1,63 @@
+import pytest
+import redis
+from unittest.mock import Mock
+from app import rate_limiter
+from app.rate_limiter import RateLimiter, RateLimited, INTERACTIVE, BACKGROUND
+
+
+def make_limiter(script_results, **kwargs):
+    script = Mock(side_effect=script_results)
+    client = Mock(register_script=Mock(return_value=script))
+    return RateLimiter(redis_getter=lambda: client, rate=10, capacity=10, interactive_reserve=0.3, **kwargs), script
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_background_waits_for_refill(no_sleep):
+    limiter, script = make_limiter([200, 100, 0])
+
+    limiter.acquire(BACKGROUND)
+
+    assert len(no_sleep) == 2 and 0.2 <= no_sleep[0] <= 0.3
+    stats = limiter.limiter_stats()[BACKGROUND]
+    assert stats["granted"] == 1 and stats["throttled"] == 2
+
+
+def test_priorities_use_their_floor():
+    limiter, script = make_limiter([0, 0])
+
+    limiter.acquire(INTERACTIVE)
+    limiter.acquire(BACKGROUND)
+
+    floors = [call.kwargs["args"][2] for call in script.call_args_list]
+    assert floors == [0, 3]
+
+
+def test_gives_up_after_max_wait():
+    limiter, _ = make_limiter([5000])
+
+    with pytest.raises(RateLimited):
+        limiter.acquire(INTERACTIVE, max_wait=1)
+    assert limiter.limiter_stats()[INTERACTIVE]["rejected"] == 1
+
+
+def test_fails_open_without_redis(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "mark_redis_down", Mock())
+    limiter, _ = make_limiter(redis.ConnectionError("down"))
+
+    limiter.acquire(BACKGROUND)
+    RateLimiter(redis_getter=lambda: None).acquire(BACKGROUND)
+
+    rate_limiter.mark_redis_down.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_acquire_async():
+    limiter, script = make_limiter([0])
+    await limiter.acquire_async(INTERACTIVE)
+    assert limiter.limiter_stats()[INTERACTIVE]["granted"] == 1
@@ -0,0 +1,109 @@
+import gzip
+import json
+import brotli
+import pytest
+from unittest.mock import Mock
+from fastapi.testclient import TestClient
+from app import main, response_cache as response_cache_module
+from app.main import app
+from app.amadeus_cache import amadeus_cache
+from app.auth.dependencies import get_current_user
+from app.response_cache import BROTLI_QUALITY, CachedResponse, etag_matches, negotiate_encoding, response_cache
+
+SEARCH = {"origin": "MAD", "departureDate": "2025-05-01", "viewBy": "DATE"}
+DESTINATIONS = [{"type": "flight-destination", "origin": "MAD", "destination": f"D{i:02d}", "price": {"total": "99.00"}}
+                for i in range(40)]
+UPSTREAM_BODY = json.dumps({"data": DESTINATIONS, "meta": {"currency": "EUR"}}, indent=1).encode()
+
+
+class FakeAmadeus:
+    def __init__(self):
+        self.calls = []
+
+    async def flight_destinations_body(self, **params):
+        self.calls.append(params)
+        return UPSTREAM_BODY
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeAmadeus()
+    monkeypatch.setattr(main, "amadeus", fake)
+    monkeypatch.setattr(amadeus_cache, "redis_getter", lambda: None)
+    amadeus_cache.l1.clear()
+    response_cache.clear()
+    app.dependency_overrides[get_current_user] = lambda: Mock(id=1, email="a@example.com")
+    yield TestClient(app), fake
+    app.dependency_overrides.pop(get_current_user)
+
+
+def test_negotiate_encoding():
+    available = {"identity": b"", "gzip": b"", "br": b""}
+    assert negotiate_encoding("gzip, deflate, br", available) == "br"
+    assert negotiate_encoding("gzip, br;q=0", available) == "gzip"
+    assert negotiate_encoding("gzip", {"identity": b""}) == "identity"
+    assert negotiate_encoding(None, available) == "identity"
+    assert negotiate_encoding("*", {"identity": b"", "gzip": b""}) == "gzip"
+
+
+def test_etag_matches_lists_and_weak_tags():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abc"', '"def"')
+    assert etag_matches('"abc"', 'W/"abc"')
+
+
+def test_etag_is_weak_since_encodings_share_it():
+    assert CachedResponse(b"x" * 2048).etag.startswith('W/"')
+
+
+def test_small_bodies_are_not_compressed():
+    assert list(CachedResponse(b'{"data":[]}').encodings) == ["identity"]
+
+
+def test_repeat_search_is_served_from_the_response_cache(client):
+    client, fake = client
+    first = client.get("/api/flight_destinations", params=SEARCH, headers={"Accept-Encoding": "gzip"})
+    # Same search, different case and POSTed: one normalized key
+    second = client.post("/api/flight_destinations", json={**SEARCH, "origin": "mad"}, headers={"Accept-Encoding": "gzip"})
+
+    assert len(fake.calls) == 1
+    # The upstream body is passed through byte for byte
+    assert first.content == second.content == UPSTREAM_BODY
+    assert first.json()["data"] == DESTINATIONS
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == f"private, max-age={response_cache.ttl}"
+    assert int(first.headers["content-length"]) == len(gzip.compress(first.content, 6))
+
+
+def test_revalidation_returns_304(client):
+    client, fake = client
+    etag = client.get("/api/flight_destinations", params=SEARCH).headers["etag"]
+
+    response = client.get("/api/flight_destinations", params=SEARCH, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert len(fake.calls) == 1
+
+
+def test_brotli_is_served_and_large_bodies_are_compressed_off_the_event_loop(client, monkeypatch):
+    client, fake = client
+    offloaded = []
+
+    async def run_in_threadpool(fn, *args):
+        offloaded.append(fn)
+        return fn(*args)
+
+    monkeypatch.setattr(response_cache_module, "COMPRESS_THREADPOOL_MIN_BYTES", len(UPSTREAM_BODY))
+    monkeypatch.setattr(response_cache_module, "run_in_threadpool", run_in_threadpool)
+
+    response = client.get("/api/flight_destinations", params=SEARCH, headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert int(response.headers["content-length"]) == len(brotli.compress(UPSTREAM_BODY, quality=BROTLI_QUALITY))
+    # The test client decodes brotli back to the upstream body
+    assert response.content == UPSTREAM_BODY
+    assert offloaded == [response_cache.put]
@@ -1,5 +1,5 @@
 import pytest
-from app.email_service import send_email
+from app.email_service import send_email, build_batches
 
 def test_send_email_success():
     response = send_email("verified_email@example.com", "Test Subject", "<p>Test Content</p>")
@@ -9,4 +9,16 @@ def test_send_email_success():
 def test_send_email_failure():
     response = send_email("invalid_email", "Test Subject", "<p>Test Content</p>")
     assert "error" in response
-    assert response["error"] != ""
\ No newline at end of file
+    assert response["error"] != ""
+
+def test_build_batches_groups_identical_messages():
+    messages = [
+        {"to_email": f"user{i}@example.com", "subject": "Flight Price Alert", "content": "MAD-BCN"} for i in range(3)
+    ] + [{"to_email": "other@example.com", "subject": "Flight Price Alert", "content": "MAD-LPA"}]
+
+    batches = build_batches(messages, max_personalizations=2)
+
+    assert [len(payload["personalizations"]) for payload, _ in batches] == [2, 1, 1]
+    assert batches[0][0]["personalizations"][1] == {"to": [{"email": "user1@example.com"}]}
+    assert batches[0][1] == messages[:2]
+    assert batches[2][0]["content"][0]["value"] == "MAD-LPA"
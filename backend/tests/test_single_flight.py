@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import pytest
+from app.single_flight import SingleFlight, AsyncSingleFlight
+
+
+def run_concurrently(flight, key, fetch, callers=8):
+    results, errors = [], []
+    barrier = threading.Barrier(callers)
+
+    def call():
+        barrier.wait()
+        try:
+            results.append(flight.do(key, fetch, label="search"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_share_one_fetch():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(1)
+        return ["offer"]
+
+    threading.Timer(0.1, release.set).start()
+    results, errors = run_concurrently(flight, "MAD-BCN", fetch)
+
+    assert len(calls) == 1 and errors == []
+    assert results == [["offer"]] * 8
+    assert flight.flight_stats()["search"] == {"calls": 1, "coalesced": 7}
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(1)
+        raise RuntimeError("upstream down")
+
+    threading.Timer(0.1, release.set).start()
+    results, errors = run_concurrently(flight, "MAD-BCN", fetch, callers=4)
+
+    assert results == [] and len(errors) == 4
+    assert flight.do("MAD-BCN", lambda: "recovered") == "recovered"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_waiters():
+    flight = AsyncSingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "offers"
+
+    leader = asyncio.ensure_future(flight.do("MAD-BCN", fetch))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("MAD-BCN", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "offers"
+    assert flight.flight_stats()["default"] == {"calls": 1, "coalesced": 1}
@@ -0,0 +1,102 @@
+import time
+import pytest
+from unittest.mock import Mock
+from fastapi import HTTPException
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User
+from app.auth import dependencies
+from app.auth.dependencies import get_current_user, user_cache
+
+SECRET = "test-secret"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(dependencies, "SECRET_KEY", SECRET)
+    monkeypatch.setattr(dependencies, "ALGORITHM", "HS256")
+    user_cache.clear()
+    user_cache.stats.update(hits=0, misses=0)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="test@test.com", hashed_password="x"))
+    session.commit()
+    yield session
+    session.close()
+    user_cache.clear()
+
+
+def make_request(email="test@test.com", expires_in=900):
+    token = jwt.encode({"sub": email, "exp": int(time.time()) + expires_in}, SECRET, algorithm="HS256")
+    return Mock(cookies={"access_token": token})
+
+
+def test_repeated_requests_resolve_user_once(db):
+    request = make_request()
+    db.query = Mock(wraps=db.query)
+
+    users = [get_current_user(request, db) for _ in range(5)]
+
+    assert db.query.call_count == 1
+    assert all(user.id == 1 and user.email == "test@test.com" for user in users)
+    assert user_cache.cache_stats()["hit_ratio"] == 0.8
+
+
+def test_deleting_user_invalidates_cached_tokens(db):
+    request = make_request()
+    get_current_user(request, db)
+
+    db.delete(db.get(User, 1))
+    db.commit()
+
+    with pytest.raises(HTTPException) as error:
+        get_current_user(request, db)
+    assert error.value.status_code == 401
+
+
+def test_logout_invalidates_token(db):
+    request = make_request()
+    get_current_user(request, db)
+
+    user_cache.invalidate_token(request.cookies["access_token"])
+
+    assert user_cache.get(request.cookies["access_token"]) is None
+
+
+def test_expired_token_is_not_cached(db):
+    user_cache.set("token", Mock(email="test@test.com"), time.time() - 1)
+    assert user_cache.get("token") is None
+
+
+def test_invalidation_bookkeeping_stays_bounded(db):
+    cache = dependencies.UserCache(max_entries=10, ttl=0.05)
+    for i in range(100):
+        cache.set(f"token-{i}", Mock(email=f"user{i}@test.com"), time.time() + 900)
+        cache.invalidate_user(f"user{i}@test.com")
+    time.sleep(0.06)
+    cache.invalidate_user("last@test.com")
+
+    assert len(cache._entries) <= 10
+    assert list(cache._invalidated_at) == ["last@test.com"]
+
+
+def test_token_cached_after_invalidation_is_served(db):
+    user = Mock(email="test@test.com")
+    user_cache.set("old", user, time.time() + 900)
+    user_cache.invalidate_user("test@test.com")
+    user_cache.set("new", user, time.time() + 900)
+
+    assert user_cache.get("old") is None
+    assert user_cache.get("new") is user
+
+
+def test_invalidating_with_caching_disabled(db):
+    cache = dependencies.UserCache(ttl=0)
+    cache.set("token", Mock(email="a@b.c"), time.time() + 900)
+    cache.invalidate_user("a@b.c")
+
+    assert cache.get("token") is None
+    assert not cache._invalidated_at
@@ -89,13 +89,14 @@ const Home = () => {
         origin: departure,
         departureDate: isOneWay ? startDate : `${startDate},${endDate}`,
         oneWay: isOneWay,
-        maxPrice: parsedMaxPrice,
+        maxPrice: Number.isNaN(parsedMaxPrice) ? undefined : parsedMaxPrice,
         viewBy: isOneWay ? 'DATE' : 'DURATION',
       };
       if (!isOneWay && duration) {
         requestPayload.duration = duration;
       }
-      const response = await axios.post('http://localhost:8000/api/flight_destinations', requestPayload, { withCredentials: true });
+      // GET so the browser can cache the results and revalidate them with the ETag
+      const response = await axios.get('http://localhost:8000/api/flight_destinations', { params: requestPayload, withCredentials: true });
       setLocations(response.data.data);
       setHasMore(response.data.data.length > 0);
       setLoading(false);
@@ -114,13 +115,14 @@ const Home = () => {
         origin: departure,
         departureDate: isOneWay ? startDate : `${startDate},${endDate}`,
         oneWay: isOneWay,
-        maxPrice: parsedMaxPrice,
+        maxPrice: Number.isNaN(parsedMaxPrice) ? undefined : parsedMaxPrice,
         viewBy: isOneWay ? 'DATE' : 'DURATION',
       };
       if (!isOneWay && duration) {
         requestPayload.duration = duration;
       }
-      const response = await axios.post('http://localhost:8000/api/flight_destinations', requestPayload, { withCredentials: true });
+      // GET so the browser can cache the results and revalidate them with the ETag
+      const response = await axios.get('http://localhost:8000/api/flight_destinations', { params: requestPayload, withCredentials: true });
       setLocations((prevLocations) => [...prevLocations, ...response.data.data]);
       setPage((prevPage) => prevPage + 1);
       setHasMore(response.data.data.length > 0);
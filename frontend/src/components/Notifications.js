@@ -12,8 +12,18 @@ const Notifications = () => {
   useEffect(() => {
     const fetchNotifications = async () => {
       try {
-        const response = await axios.get('http://localhost:8000/notify/notify/notifications/', { withCredentials: true });
-        setNotifications(response.data);
+        // The list is paginated: follow X-Next-Cursor until the last page
+        const all = [];
+        let after = null;
+        do {
+          const response = await axios.get('http://localhost:8000/notify/notify/notifications/', {
+            params: after ? { after } : {},
+            withCredentials: true,
+          });
+          all.push(...response.data);
+          after = response.headers['x-next-cursor'];
+        } while (after);
+        setNotifications(all);
       } catch (error) {
         setError('Failed to load notifications.');
       } finally {